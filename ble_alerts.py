@@ -0,0 +1,233 @@
+# ble_alerts.py
+# Canlı akışın eşiklere göre host tarafında değerlendirilmesi.
+# Cihaza write_glucose_thresholds / write_temperature_thresholds ile yazılan
+# eşikler burada her örnekte kontrol edilir; alarm geçişin olduğu örnekte üretilir.
+#
+# Her kanal (ör. (mac, "glikoz")) için zaman pencereli kayan toplamlar tutulur:
+# ortalama ve en küçük kareler eğimi (birim/saniye) örnek başına sabit sürede
+# güncellenir (her örnek pencereye bir kez girer, bir kez çıkar).
+# Kurallar ham değer, kayan ortalama ya da eğim üzerinde çalışır; histerezis
+# sayesinde eşik çevresinde titreşen değer art arda alarm üretmez.
+import collections
+
+from ble_core import GLUCOSE_LEVELS, TEMPERATURE_LEVELS
+
+VALUE = "value"
+MEAN  = "mean"
+SLOPE = "slope"
+
+RAISE = "raise"
+CLEAR = "clear"
+
+Alert = collections.namedtuple("Alert", ["channel", "t", "rule", "kind", "value"])
+
+
+class Rule:
+    """
+    :param name: alarm adı (ör. "Yüksek")
+    :param limit: eşik
+    :param above: True → limit üstü alarm, False → limit altı alarm
+    :param hysteresis: alarm, değer eşiğin bu kadar gerisine dönünce kalkar
+    :param source: VALUE (ham örnek), MEAN (kayan ortalama) veya SLOPE (birim/saniye)
+    """
+
+    __slots__ = ("name", "limit", "above", "hysteresis", "source")
+
+    def __init__(self, name, limit, above=True, hysteresis=0.0, source=VALUE):
+        if source not in (VALUE, MEAN, SLOPE):
+            raise ValueError(f"Bilinmeyen kaynak: {source}")
+        self.name = name
+        self.limit = limit
+        self.above = above
+        self.hysteresis = hysteresis
+        self.source = source
+
+    def active(self, x, was_active) -> bool:
+        if self.above:
+            return x > (self.limit - self.hysteresis if was_active else self.limit)
+        return x < (self.limit + self.hysteresis if was_active else self.limit)
+
+    def __repr__(self):
+        op = ">" if self.above else "<"
+        return f"Rule({self.name!r}: {self.source} {op} {self.limit} ±{self.hysteresis})"
+
+
+def glucose_rules(thresholds: dict, hysteresis=2.0, source=VALUE):
+    """read_glucose_thresholds() sonucu için kurallar: Düşük altı ve Yüksek üstü."""
+    low, _, high = (thresholds[level] for level in GLUCOSE_LEVELS)
+    return [
+        Rule(GLUCOSE_LEVELS[0], low, above=False, hysteresis=hysteresis, source=source),
+        Rule(GLUCOSE_LEVELS[2], high, above=True, hysteresis=hysteresis, source=source),
+    ]
+
+
+def temperature_rules(thresholds: dict, hysteresis=0.5, source=VALUE):
+    """read_temperature_thresholds() sonucu için kurallar."""
+    low, high = (thresholds[level] for level in TEMPERATURE_LEVELS)
+    return [
+        Rule(TEMPERATURE_LEVELS[0], low, above=False, hysteresis=hysteresis, source=source),
+        Rule(TEMPERATURE_LEVELS[1], high, above=True, hysteresis=hysteresis, source=source),
+    ]
+
+
+def rate_rules(limit, hysteresis=0.0):
+    """Saniyede `limit` biriminden hızlı artış/düşüş alarmları (kayan pencere eğimi)."""
+    return [
+        Rule("Hızlı artış", limit, above=True, hysteresis=hysteresis, source=SLOPE),
+        Rule("Hızlı düşüş", -limit, above=False, hysteresis=hysteresis, source=SLOPE),
+    ]
+
+
+class RollingWindow:
+    """
+    Son `span` saniyedeki örnekler için ortalama ve eğim.
+    Zamanlar ilk örneğe göre kaydırılır; büyük epoch değerlerinde kareler taşmaz.
+    """
+
+    __slots__ = ("span", "_samples", "_t0", "n", "sum_t", "sum_v", "sum_tt", "sum_tv")
+
+    def __init__(self, span):
+        self.span = span
+        self._samples = collections.deque()
+        self._t0 = None
+        self.n = 0
+        self.sum_t = self.sum_v = self.sum_tt = self.sum_tv = 0.0
+
+    def add(self, t, v):
+        if self._t0 is None:
+            self._t0 = t
+        t -= self._t0
+        self._samples.append((t, v))
+        self.n += 1
+        self.sum_t += t
+        self.sum_v += v
+        self.sum_tt += t * t
+        self.sum_tv += t * v
+        horizon = t - self.span
+        samples = self._samples
+        while samples[0][0] < horizon:
+            old_t, old_v = samples.popleft()
+            self.n -= 1
+            self.sum_t -= old_t
+            self.sum_v -= old_v
+            self.sum_tt -= old_t * old_t
+            self.sum_tv -= old_t * old_v
+
+    def mean(self):
+        return self.sum_v / self.n if self.n else None
+
+    def slope(self):
+        """En küçük kareler eğimi (birim/saniye); iki farklı zamanlı örnek yoksa None."""
+        n = self.n
+        if n < 2:
+            return None
+        denom = n * self.sum_tt - self.sum_t * self.sum_t
+        if denom <= 1e-12 * n * self.sum_tt:
+            return None
+        return (n * self.sum_tv - self.sum_t * self.sum_v) / denom
+
+
+class _ChannelState:
+    __slots__ = ("window", "rules", "active", "last")
+
+    def __init__(self, window, rules):
+        self.window = window
+        self.rules = rules
+        self.active = [False] * len(rules)
+        self.last = None
+
+
+class AlertEngine:
+    """
+    Çok cihazlı/çok kanallı artımlı alarm değerlendirici.
+
+        engine = AlertEngine(window=60.0)
+        engine.set_rules((mac, "glikoz"), glucose_rules(eşikler) + rate_rules(2.0))
+        for alert in engine.feed((mac, "glikoz"), t, değer): ...
+
+    :param rules: kuralı ayrıca verilmeyen kanallar için varsayılan kurallar
+    :param window: ortalama/eğim penceresi (saniye)
+    """
+
+    def __init__(self, rules=None, window=60.0):
+        self.default_rules = list(rules or [])
+        self.window = window
+        self._rules = {}
+        self._channels = {}
+        self.samples = 0
+        self.alerts = 0
+
+    def set_rules(self, channel, rules):
+        """Kanalın kurallarını değiştirir (ör. cihaza yeni eşik yazıldığında). Aktif alarmlar sıfırlanır."""
+        self._rules[channel] = list(rules)
+        state = self._channels.get(channel)
+        if state is not None:
+            state.rules = self._rules[channel]
+            state.active = [False] * len(state.rules)
+
+    def _state(self, channel):
+        state = self._channels.get(channel)
+        if state is None:
+            rules = self._rules.get(channel, self.default_rules)
+            state = self._channels[channel] = _ChannelState(RollingWindow(self.window), rules)
+        return state
+
+    def feed(self, channel, t, value):
+        """
+        Tek örneği işler. Sayısal olmayan değerler yok sayılır.
+        Döner: bu örnekte başlayan/kalkan alarmlar (çoğunlukla boş liste).
+        """
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return []
+        self.samples += 1
+        state = self._state(channel)
+        window = state.window
+        window.add(t, value)
+        state.last = value
+        measures = {VALUE: value, MEAN: None, SLOPE: None}
+        out = []
+        for i, rule in enumerate(state.rules):
+            x = measures[rule.source]
+            if x is None:
+                x = measures[rule.source] = window.mean() if rule.source == MEAN else window.slope()
+                if x is None:
+                    continue
+            was_active = state.active[i]
+            now_active = rule.active(x, was_active)
+            if now_active != was_active:
+                state.active[i] = now_active
+                out.append(Alert(channel, t, rule.name, RAISE if now_active else CLEAR, x))
+        self.alerts += len(out)
+        return out
+
+    def feed_batch(self, samples):
+        """
+        [(kanal, t, değer), ...] örneklerini sırayla işler; kanallar karışık olabilir.
+        Döner: tüm alarmlar, örnek sırasına göre.
+        """
+        out = []
+        feed = self.feed
+        for channel, t, value in samples:
+            alerts = feed(channel, t, value)
+            if alerts:
+                out.extend(alerts)
+        return out
+
+    def active(self, channel=None) -> dict:
+        """Şu an aktif alarmlar: {kanal: [kural adı, ...]}"""
+        channels = self._channels if channel is None else {channel: self._channels.get(channel)}
+        return {
+            ch: [rule.name for rule, on in zip(state.rules, state.active) if on]
+            for ch, state in channels.items()
+            if state is not None and any(state.active)
+        }
+
+    def stats(self, channel):
+        """Kanalın son değeri, kayan ortalaması ve eğimi."""
+        state = self._channels.get(channel)
+        if state is None:
+            return None
+        return {"last": state.last, "mean": state.window.mean(), "slope": state.window.slope(),
+                "samples": state.window.n}
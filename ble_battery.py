@@ -0,0 +1,155 @@
+# ble_battery.py
+# Batarya seviyesi takibi (Wizepod oturumu üzerinden, ek bağlantı açmadan).
+# Cihaz standart Battery Level karakteristiğinde notify destekliyorsa abone olunur,
+# desteklemiyorsa uyarlanabilir aralıkla okunur: seviye sabitken seyrek,
+# hızlı düşüyorsa veya düşükse sık. Son değer önbellekte tutulur; UI yalnızca
+# önbelleği okur, her yenilemede BLE trafiği oluşmaz.
+# İzleyici bağlantı açmaz ve yeniden bağlanmaz: oturumun sahibi (ble_daemon)
+# bağlantıyı yönetir. Bağlantı yokken beklenir, geri gelince abonelik yenilenir.
+# Sorgular `read` ile sahibin komut kuyruğundan (arka plan önceliğinde) geçer;
+# `busy()` doğruyken (kuyrukta kullanıcı komutu varken) sorgu ertelenir.
+import asyncio
+import time
+
+BATTERY_LEVEL_UUID = "00002a19-0000-1000-8000-00805f9b34fb"
+
+_WATCH_INTERVAL = 5.0   # notify modunda / bağlantı yokken kontrol aralığı (sn)
+_BUSY_DELAY = 1.0       # hat meşgulken sorgunun ertelenme süresi (sn)
+
+
+class BatteryMonitor:
+    """
+    :param session: bağlı Wizepod oturumu
+    :param on_change: on_change(seviye) — seviye değiştiğinde çağrılır
+    :param idle_interval: seviye sabitken en uzun sorgu aralığı (sn)
+    :param fast_interval: düşük/hızlı düşen batarya için sorgu aralığı (sn)
+    :param low_level: bu yüzde ve altı "düşük" kabul edilir
+    :param fast_drop: dakikada bu kadar yüzde düşüş "hızlı" kabul edilir
+    :param on_connection: on_connection(bağlı_mı) — bağlantı durumu değiştiğinde çağrılır
+    :param read: read() → bytes; sorgu okuması (varsayılan: oturumun istemcisinden doğrudan)
+    :param busy: busy() → bool; doğruysa sorgu ertelenir (ör. kuyrukta komut var)
+    """
+
+    def __init__(self, session, on_change=None, idle_interval=300.0, fast_interval=30.0,
+                 low_level=20, fast_drop=1.0, on_connection=None, read=None, busy=None):
+        self.session = session
+        self.on_change = on_change
+        self.on_connection = on_connection
+        self.read = read or (lambda: self.session.client.read_gatt_char(BATTERY_LEVEL_UUID))
+        self.busy = busy
+        self.idle_interval = idle_interval
+        self.fast_interval = fast_interval
+        self.low_level = low_level
+        self.fast_drop = fast_drop
+        self.level = None
+        self.updated_at = None
+        self.interval = fast_interval
+        self.mode = None          # "notify" | "poll" | None (desteklenmiyor)
+        self.connected = None
+        self._task = None
+
+    def _properties(self):
+        services = getattr(self.session.client, "services", None)
+        if services is None:
+            return None
+        char = services.get_characteristic(BATTERY_LEVEL_UUID)
+        return None if char is None else set(char.properties)
+
+    async def start(self):
+        """İzlemeyi arka planda başlatır; bağlantı oturumun sahibine aittir."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _subscribe(self):
+        props = self._properties()
+        if props is None:
+            self.mode = None
+        elif "notify" in props:
+            self.mode = "notify"
+            await self.session.client.start_notify(BATTERY_LEVEL_UUID, self._on_notify)
+            if "read" in props:
+                await self._read()
+        elif "read" in props:
+            self.mode = "poll"
+        else:
+            self.mode = None
+
+    def _set_connected(self, connected: bool):
+        if connected != self.connected:
+            self.connected = connected
+            if self.on_connection:
+                self.on_connection(connected)
+
+    async def stop(self):
+        if self.mode == "notify" and self.connected:
+            try:
+                await self.session.client.stop_notify(BATTERY_LEVEL_UUID)
+            except Exception:
+                pass
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notify(self, sender, data: bytearray):
+        if data:
+            self._update(data[0])
+
+    async def _read(self):
+        data = await self.read()
+        if data:
+            self._update(data[0])
+
+    def _update(self, level: int):
+        now = time.monotonic()
+        prev, prev_t = self.level, self.updated_at
+        self.level, self.updated_at = level, now
+        self.interval = self._next_interval(prev, prev_t, level, now)
+        if level != prev and self.on_change:
+            self.on_change(level)
+
+    def _next_interval(self, prev, prev_t, level, now) -> float:
+        if level <= self.low_level:
+            return self.fast_interval
+        if prev is None or prev_t is None:
+            return self.interval
+        drop_per_min = (prev - level) / max(now - prev_t, 1e-6) * 60.0
+        if drop_per_min >= self.fast_drop:
+            return self.fast_interval
+        if level != prev:
+            # Değişim var → aralığı yarıya indir
+            return max(self.fast_interval, self.interval / 2)
+        # Sabit → aralığı ikiye katla
+        return min(self.idle_interval, self.interval * 2)
+
+    async def _run(self):
+        subscribed = False
+        while True:
+            try:
+                if not self.session.client.is_connected:
+                    # Bağlanmak sahibin işi; geri gelince abonelik yenilenir
+                    self._set_connected(False)
+                    subscribed = False
+                    await asyncio.sleep(_WATCH_INTERVAL)
+                    continue
+                self._set_connected(True)
+                if not subscribed:
+                    await self._subscribe()
+                    subscribed = True
+                    if self.mode is None:
+                        return   # cihaz batarya karakteristiği sunmuyor
+                if self.mode == "poll":
+                    if self.busy is not None and self.busy():
+                        await asyncio.sleep(_BUSY_DELAY)
+                        continue
+                    await self._read()
+                # notify modunda yalnızca bağlantı kontrol edilir
+                await asyncio.sleep(self.interval if self.mode == "poll" else _WATCH_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("Batarya okuma hatası:", e)
+                await asyncio.sleep(_WATCH_INTERVAL)
@@ -0,0 +1,194 @@
+# ble_bulk.py
+# Büyük veri blokları (kalibrasyon tablosu, log dökümü vb.) için
+# MTU'ya göre parçalı, kredi/pencere akış kontrollü toplu aktarım kanalı.
+#
+# Çerçeve yapısı (cihaz firmware'i ile uyumlu olmalı):
+#   Host → Cihaz  : [0x70, seq_lo, seq_hi, flags, veri...]      (Write Without Response)
+#   Cihaz → Host  : [0x71, kredi]                                 (Indicate, kredi iadesi)
+#   Cihaz → Host  : [0x72, seq, flags, veri...]                   (Indicate, çok paketli cevap)
+# flags bit0 = son paket
+import asyncio
+
+BULK_DATA   = 0x70
+BULK_CREDIT = 0x71
+BULK_REPLY  = 0x72
+
+FLAG_LAST = 0x01
+
+ATT_DEFAULT_MTU = 23   # BLE 4.0 varsayılan ATT MTU
+ATT_HEADER      = 3    # opcode (1) + handle (2)
+DATA_HEADER     = 4    # 0x70 + seq (2) + flags
+REPLY_HEADER    = 3    # 0x72 + seq + flags
+
+
+def chunk_size(mtu: int) -> int:
+    """Bir ATT yazmasına sığan faydalı veri boyu."""
+    return max(1, mtu - ATT_HEADER - DATA_HEADER)
+
+
+def chunk_payload(data: bytes, mtu: int):
+    """
+    Veriyi MTU boyutunda 0x70 çerçevelerine böler.
+    Her eleman gönderilmeye hazır bytes nesnesidir.
+    """
+    size = chunk_size(mtu)
+    view = memoryview(data)
+    total = max(1, (len(data) + size - 1) // size)
+    for seq in range(total):
+        part = view[seq * size:(seq + 1) * size]
+        flags = FLAG_LAST if seq == total - 1 else 0
+        yield bytes([BULK_DATA, seq & 0xFF, (seq >> 8) & 0xFF, flags]) + part
+
+
+class CreditWindow:
+    """
+    Kredi tabanlı akış kontrolü.
+    Her yazma bir kredi harcar; cihaz 0x71 ile kredi iade eder.
+    Cihaz kredi göndermiyorsa (device_credits=False) pencere dolunca
+    `pace` saniye beklenip pencere yeniden açılır.
+    """
+
+    def __init__(self, window: int = 8, device_credits: bool = True, pace: float = 0.015):
+        self.window = window
+        self.device_credits = device_credits
+        self.pace = pace
+        self._credits = window
+        self._evt = asyncio.Event()
+
+    async def acquire(self, timeout: float = 2.0):
+        while self._credits <= 0:
+            if not self.device_credits:
+                # Kredisiz cihaz: kuyruğun boşalması için bağlantı aralığı kadar bekle
+                await asyncio.sleep(self.pace)
+                self._credits = self.window
+                break
+            self._evt.clear()
+            try:
+                await asyncio.wait_for(self._evt.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError("Cihaz kredi iade etmedi (bulk akış kontrolü).")
+        self._credits -= 1
+
+    def grant(self, count: int):
+        """Indicate callback'inden çağrılır (aynı event loop içinde)."""
+        self._credits = min(self.window, self._credits + count)
+        self._evt.set()
+
+    def reset(self):
+        """Pencereyi doldurur (yeni aktarımın başında)."""
+        self._credits = self.window
+        self._evt.set()
+
+    @property
+    def outstanding(self) -> int:
+        """Harcanıp henüz iade edilmemiş kredi sayısı."""
+        return self.window - self._credits
+
+    async def drain(self, timeout: float = 2.0) -> bool:
+        """
+        Yoldaki kredilerin dönmesini bekler; pencere bundan önce ayrılırsa
+        geç gelen 0x71 çerçeveleri kaybolur ve sonraki aktarımın penceresi küçülür.
+        Döner: tüm krediler döndüyse True (kredisiz cihazda her zaman True).
+        """
+        if not self.device_credits:
+            return True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._credits < self.window:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            self._evt.clear()
+            try:
+                await asyncio.wait_for(self._evt.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+
+class Reassembler:
+    """Çok paketli 0x72 indicate cevaplarını tek bayt dizisinde birleştirir."""
+
+    def __init__(self):
+        self._parts = bytearray()
+        self._next_seq = 0
+
+    def reset(self):
+        self._parts.clear()
+        self._next_seq = 0
+
+    def feed(self, frame: bytes):
+        """
+        Bir 0x72 çerçevesi ekler.
+        Döner: son paket geldiyse birleşmiş veri, aksi halde None.
+        """
+        if len(frame) < REPLY_HEADER:
+            raise ValueError(f"Eksik bulk cevap çerçevesi ({len(frame)} byte)")
+        seq, flags = frame[1], frame[2]
+        if seq != self._next_seq & 0xFF:
+            expected = self._next_seq & 0xFF
+            self.reset()
+            raise ValueError(f"Bulk cevap sırası bozuk (beklenen {expected}, gelen {seq})")
+        self._parts += frame[REPLY_HEADER:]
+        self._next_seq += 1
+        if flags & FLAG_LAST:
+            data = bytes(self._parts)
+            self.reset()
+            return data
+        return None
+
+
+class BulkTransfer:
+    """
+    Wizepod oturumu üzerinden büyük veri gönderimi.
+    MTU bağlantı sırasında sorgulanır; veriler ATT boyutunda parçalanıp
+    kredi penceresiyle Write Without Response olarak akıtılır.
+
+    Tek seferlik gönderimde send() pencereyi kendisi bağlar ve yoldaki krediler
+    dönene kadar ayırmaz. Art arda bloklar (ör. OTA) için pencere bir kez bağlanır:
+
+        async with BulkTransfer(oturum) as transfer:
+            for blok in bloklar:
+                await transfer.send(blok)
+    """
+
+    def __init__(self, session, window: int = 8, device_credits: bool = True):
+        self.session = session
+        self.credits = CreditWindow(window, device_credits)
+        self._attached = False
+
+    def attach(self):
+        self.credits.reset()
+        self.session.attach_credits(self.credits)
+        self._attached = True
+
+    def detach(self):
+        self.session.attach_credits(None)
+        self._attached = False
+
+    async def __aenter__(self):
+        self.attach()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.credits.drain()
+        finally:
+            self.detach()
+
+    async def _send_frames(self, data: bytes) -> int:
+        mtu = self.session.mtu or ATT_DEFAULT_MTU
+        sent = 0
+        for frame in chunk_payload(data, mtu):
+            await self.credits.acquire()
+            await self.session.write(frame)
+            sent += 1
+        return sent
+
+    async def send(self, data: bytes) -> int:
+        """Veriyi gönderir, gönderilen çerçeve sayısını döner."""
+        if self._attached:
+            return await self._send_frames(data)
+        async with self:
+            return await self._send_frames(data)
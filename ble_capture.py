@@ -0,0 +1,223 @@
+# ble_capture.py
+# Ham BLE trafiği kaydı ve hızlandırılmış tekrar oynatma.
+#
+# Dosya yapısı (.wzcap):
+#   başlık : [b"WZCAP1", başlangıç_duvar_saati_ns(q)]
+#   kayıt  : [t_ns(q), yön(B), uzunluk(H), veri...]
+# t_ns başlangıçtan itibaren monoton saat (perf_counter_ns) farkıdır;
+# duvar saati = başlangıç + t_ns. yön: 0 = TX (host → cihaz), 1 = RX (cihaz → host)
+#
+# Tekrar oynatma sahadaki trafiği çözümleyici/önbellek/UI hattına geri besler:
+#   - ReplayClient: BleakClient yerine geçer, Wizepod oturumu değişmeden çalışır
+#   - replay_main : ble_workers hattında BLE süreci yerine halkayı doldurur
+# speed=1 gerçek zaman, speed=N N kat hızlı, speed=None beklemeden (en yüksek hız).
+import asyncio
+import struct
+import threading
+import time
+
+CAPTURE_MAGIC = b"WZCAP1"
+CAPTURE_HEADER = struct.Struct("<6sq")
+RECORD_HEADER = struct.Struct("<qBH")
+
+TX = 0
+RX = 1
+
+FLUSH_FRAMES = 64
+FLUSH_INTERVAL = 0.5
+
+
+class CaptureWriter:
+    """
+    Çerçeveler her `flush_frames` kayıtta bir ve ayrıca arka plandaki zamanlayıcıyla
+    her `flush_interval` saniyede bir diske aktarılır; böylece bir çerçeve patlamasının
+    ardından trafik kesilse de süreç çöktüğünde en fazla bu kadarlık kayıt kaybolur.
+    """
+
+    def __init__(self, path, flush_frames=FLUSH_FRAMES, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self._file = open(path, "wb")
+        self._t0 = time.perf_counter_ns()
+        self.wall_start_ns = time.time_ns()
+        self._file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, self.wall_start_ns))
+        self._file.flush()
+        self.frames = 0
+        self.flush_frames = flush_frames
+        self.flush_interval = flush_interval
+        self._unflushed = 0
+        # Yazma ile zamanlayıcı aynı dosyaya dokunur; kilit ikisini sıralar
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, name="capture-flush",
+                                             daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._unflushed:
+                    self._flush()
+
+    def _flush(self):
+        if self._file.closed:
+            return
+        self._file.flush()
+        self._unflushed = 0
+
+    def write(self, direction: int, data, t_ns=None):
+        if t_ns is None:
+            t_ns = time.perf_counter_ns()
+        with self._lock:
+            self._file.write(RECORD_HEADER.pack(t_ns - self._t0, direction, len(data)))
+            self._file.write(data)
+            self.frames += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_frames:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def tx(self, data, t_ns=None):
+        self.write(TX, data, t_ns)
+
+    def rx(self, data, t_ns=None):
+        self.write(RX, data, t_ns)
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        if self._flusher is not None:
+            self._flusher.join()
+
+
+def read_capture(path):
+    """
+    Kayıt dosyasını okur.
+    Döner: (başlangıç_duvar_saati_ns, [(t_ns, yön, bytes), ...])
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, wall_start_ns = CAPTURE_HEADER.unpack_from(data, 0)
+    if magic != CAPTURE_MAGIC:
+        raise ValueError(f"Geçersiz kayıt dosyası: {path}")
+    frames = []
+    pos = CAPTURE_HEADER.size
+    while pos + RECORD_HEADER.size <= len(data):
+        t_ns, direction, length = RECORD_HEADER.unpack_from(data, pos)
+        pos += RECORD_HEADER.size
+        if pos + length > len(data):
+            break  # yarım kalmış son kayıt
+        frames.append((t_ns, direction, data[pos:pos + length]))
+        pos += length
+    return wall_start_ns, frames
+
+
+async def replay(path, sink, speed=1.0, direction=RX):
+    """
+    Kayıttaki `direction` yönündeki çerçeveleri orijinal aralıklarla
+    (speed ile ölçeklenmiş) sink(veri, duvar_saati_ns) çağrısına besler.
+    Aralıklar o yöndeki ilk çerçeveden ölçülür; kayıt başındaki sessizlik beklenmez.
+    Döner: {"frames": adet, "elapsed_s": süre, "speedup": gerçek zamana oran}
+    """
+    wall_start_ns, frames = read_capture(path)
+    frames = [f for f in frames if f[1] == direction]
+    t_first = frames[0][0] if frames else 0
+    start = time.perf_counter()
+    for t_ns, _, data in frames:
+        if speed:
+            delay = (t_ns - t_first) / 1e9 / speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        sink(data, wall_start_ns + t_ns)
+    elapsed = time.perf_counter() - start
+    span = (frames[-1][0] - frames[0][0]) / 1e9 if len(frames) > 1 else 0.0
+    return {
+        "frames": len(frames),
+        "elapsed_s": elapsed,
+        "speedup": span / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+class ReplayClient:
+    """
+    Kayıttaki RX çerçevelerini notify callback'ine basan sahte BleakClient.
+    Wizepod(addr, client=ReplayClient(yol, speed=10)) ile oturum, dinleyiciler
+    ve bildirim halkası gerçek trafikle birebir çalıştırılır.
+    """
+
+    def __init__(self, path, speed=1.0, mtu_size=247):
+        self.path = path
+        self.speed = speed
+        self.mtu_size = mtu_size
+        self.is_connected = False
+        self.tx = []
+        self.result = None
+        self._task = None
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def disconnect(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.is_connected = False
+
+    async def start_notify(self, uuid, callback):
+        async def _run():
+            self.result = await replay(self.path, lambda data, t: callback(None, bytearray(data)),
+                                       self.speed)
+        self._task = asyncio.ensure_future(_run())
+
+    async def stop_notify(self, uuid):
+        pass
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        self.tx.append(bytes(data))
+
+    async def wait_done(self):
+        """Tüm kayıt oynatılana kadar bekler. Döner: replay() özeti."""
+        if self._task is not None:
+            await self._task
+        return self.result
+
+
+def replay_main(path, ring_name, stop_event, speed=1.0):
+    """
+    ble_workers hattında BLE süreci yerine kayıttaki RX çerçevelerini halkaya basar.
+    Beklemeler stop_event üzerinden yapılır; hat durdurulunca süreç hemen biter.
+    Slot boyundan büyük çerçeveler halkaya sığmaz, atlanıp sayılır.
+    """
+    from ble_ring import FrameRing
+
+    _, frames = read_capture(path)
+    frames = [f for f in frames if f[1] == RX]
+    ring = FrameRing.attach(ring_name)
+    pushed = skipped = 0
+    try:
+        t_first = frames[0][0] if frames else 0
+        start = time.perf_counter()
+        for t_ns, _, data in frames:
+            if speed:
+                delay = (t_ns - t_first) / 1e9 / speed - (time.perf_counter() - start)
+                if delay > 0 and stop_event.wait(delay):
+                    break
+            if stop_event.is_set():
+                break
+            if len(data) > ring.slot_size:
+                skipped += 1
+                continue
+            # Halkaya geliş anı damgalanır; gecikme ölçümü tekrar oynatmada da geçerli kalır
+            ring.push(data, time.perf_counter_ns())
+            pushed += 1
+        if skipped:
+            print(f"Tekrar oynatma: slot boyundan ({ring.slot_size}) büyük {skipped} çerçeve atlandı")
+        print("Tekrar oynatma bitti:", {"frames": pushed, "skipped": skipped,
+                                        "elapsed_s": time.perf_counter() - start})
+    finally:
+        ring.close()
@@ -0,0 +1,236 @@
+# ble_core.py
+# WIZEPOD komut katmanı (Qt'siz çekirdek).
+# Tüm fonksiyonlar düz değer döner ve hata durumunda exception fırlatır;
+# widget güncelleme / mesaj kutusu gösterme işi ble_commands.py adaptörüne aittir.
+# bleak yalnızca ilk BLE işleminde yüklenir, böylece çekirdeği import etmek ucuzdur.
+import asyncio
+
+READ_UUID = "9E1547BA-C365-57B5-2947-C5E1C1E1D528"
+WRITE_UUID = "772ae377-b3d2-4f8e-4042-5481d1e0098c"
+
+# Versiyon sorgusu indicate üzerinden farklı karakteristiklerle yapılıyor
+VERSION_WRITE_UUID = "2d86686a-53dc-25b3-0c4a-f0e10c8dee20"     # Write karakteristiği
+VERSION_INDICATE_UUID = "772ae377-b3d2-4f8e-4042-5481d1e0098c"  # Indicate/Notify karakteristiği
+
+GLUCOSE_LEVELS = ("Düşük", "Normal", "Yüksek")
+TEMPERATURE_LEVELS = ("Düşük", "Yüksek")
+
+
+# Bağlantıyı kalıcı tutan bir sahip (ör. ble_daemon) istemcisini burada paylaşır;
+# komutlar her seferinde bağlanıp kopmak yerine o bağlantıyı ödünç alır.
+_shared_clients = {}
+
+
+def share_client(mac_address, client):
+    _shared_clients[mac_address] = client
+
+
+def unshare_client(mac_address):
+    _shared_clients.pop(mac_address, None)
+
+
+class _Borrowed:
+    """Paylaşılan istemci için bağlanmayan/kopmayan async with sarmalayıcısı."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def __aenter__(self):
+        return self.client
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _client(mac_address):
+    """Paylaşılan bağlantı varsa onu, yoksa geç yüklenen yeni bir BleakClient döner."""
+    client = _shared_clients.get(mac_address)
+    if client is not None:
+        return _Borrowed(client)
+    from bleak import BleakClient
+    return BleakClient(mac_address)
+
+
+# Aynı cihaza giden aynı okuma komutu için süren tek BLE değiş tokuşu.
+# Çift tıklama gibi eşzamanlı istekler aynı sonucu paylaşır; aynı karakteristiğe
+# iki paralel yazma yapılıp birbirinin cevabı çalınmaz.
+_in_flight = {}
+
+
+async def _single_flight(key, factory):
+    """
+    `key` için süren bir istek varsa onun sonucunu bekler, yoksa `factory()` başlatır.
+    Bekleyenlerden birinin iptali ortak isteği iptal etmez.
+    """
+    key = (asyncio.get_running_loop(), key)
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _in_flight[key] = task
+
+        def _done(t, key=key):
+            if _in_flight.get(key) is t:
+                del _in_flight[key]
+
+        task.add_done_callback(_done)
+    return await asyncio.shield(task)
+
+
+def parse_byte(text, label="Değer", base=0) -> int:
+    """
+    Kullanıcı girdisini 0-255 aralığında tamsayıya çevirir.
+    base=0 ile 0x10 / 16 gibi girişler desteklenir.
+    """
+    value = int(str(text).strip(), base)
+    if not (0 <= value <= 0xFF):
+        raise ValueError(f"{label} 0-255 (0x00-0xFF) arasında olmalı.")
+    return value
+
+
+async def _write_char(client, uuid, payload, response=None):
+    # response=None → bleak'in varsayılan yazma kipi (ilk sürümdeki davranış)
+    if response is None:
+        await client.write_gatt_char(uuid, bytearray(payload))
+    else:
+        await client.write_gatt_char(uuid, bytearray(payload), response=response)
+
+
+async def _write(mac_address, payload, response=None):
+    async with _client(mac_address) as client:
+        if not client.is_connected:
+            raise ConnectionError("Cihaza bağlanılamadı.")
+        await _write_char(client, WRITE_UUID, payload, response)
+
+
+async def _query(mac_address, payload, delay=0.3, min_len=1, response=None):
+    """Komutu yazar, cihazın cevabı hazırlaması için bekler ve READ_UUID'den okur."""
+    data = await _single_flight(
+        ("read", mac_address, tuple(payload)),
+        lambda: _query_once(mac_address, payload, delay, response),
+    )
+    if data is None or len(data) < min_len:
+        raise ValueError(f"Cevap beklenen uzunlukta değil ({len(data) if data else 0} byte geldi)")
+    return data
+
+
+async def _query_once(mac_address, payload, delay, response=None):
+    async with _client(mac_address) as client:
+        if not client.is_connected:
+            raise ConnectionError("Cihaza bağlanılamadı.")
+        await _write_char(client, WRITE_UUID, payload, response)
+        await asyncio.sleep(delay)
+        data = await client.read_gatt_char(READ_UUID)
+    return bytes(data) if data is not None else None
+
+
+async def _query_indicate(mac_address, payload, write_uuid, indicate_uuid, timeout=3.0):
+    """Komutu yazar ve cevabı indicate üzerinden bekler."""
+    return await _single_flight(
+        ("indicate", mac_address, tuple(payload), indicate_uuid),
+        lambda: _query_indicate_once(mac_address, payload, write_uuid, indicate_uuid, timeout),
+    )
+
+
+async def _query_indicate_once(mac_address, payload, write_uuid, indicate_uuid, timeout):
+    async with _client(mac_address) as client:
+        if not client.is_connected:
+            raise ConnectionError("Cihaza bağlanılamadı.")
+
+        future = asyncio.get_running_loop().create_future()
+
+        def handler(handle, data: bytearray):
+            if not future.done():
+                future.set_result(bytes(data))
+
+        await client.start_notify(indicate_uuid, handler)
+        try:
+            await client.write_gatt_char(write_uuid, bytearray(payload), response=True)
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            await client.stop_notify(indicate_uuid)
+
+
+# ---------- Versiyon ----------
+
+async def read_versions_data(mac_address):
+    """Döner: (yazılım, donanım) versiyon baytları (read ile)."""
+    data = await _query(mac_address, [0x50, 0x01, 0x0D, 0x0A], min_len=2, response=True)
+    return data[0], data[1]
+
+
+async def read_versions(mac_address, timeout=3.0, write_uuid=VERSION_WRITE_UUID,
+                        indicate_uuid=VERSION_INDICATE_UUID):
+    """
+    Döner: (yazılım, donanım) versiyon baytları (indicate ile).
+    Varsayılan karakteristikler "Oku" butonununkiler; komut kanalı üzerinden
+    okumak için write_uuid=WRITE_UUID, indicate_uuid=READ_UUID verilir.
+    """
+    data = await _query_indicate(
+        mac_address, [0x50, 0x01, 0x0D, 0x0A], write_uuid, indicate_uuid, timeout,
+    )
+    if len(data) < 2:
+        raise ValueError(f"Cevap beklenen uzunlukta değil ({len(data)} byte geldi)")
+    return data[0], data[1]
+
+
+async def write_yazilim_version(mac_address, versiyon: int):
+    await _write(mac_address, [0x50, 0x02, versiyon])
+
+
+async def write_donanim_version(mac_address, versiyon: int):
+    await _write(mac_address, [0x50, 0x03, versiyon])
+
+
+# ---------- AFE ----------
+
+async def read_afe_value(mac_address, read_command_code) -> int:
+    data = await _query(mac_address, [0x52, read_command_code], delay=0.5)
+    return data[0]
+
+
+async def write_afe_value(mac_address, command_code, value: int):
+    await _write(mac_address, [0x52, command_code, value])
+
+
+# ---------- Çalışma süresi ----------
+
+async def read_calisma_suresi(mac_address) -> int:
+    data = await _query(mac_address, [0x51, 0x01])
+    return int.from_bytes(data[:1], byteorder='little')
+
+
+async def write_calisma_suresi(mac_address, value: int):
+    await _write(mac_address, [0x51, 0x02, value])
+
+
+# ---------- Eşikler ----------
+
+async def read_glucose_thresholds(mac_address) -> dict:
+    """Döner: {"Düşük": .., "Normal": .., "Yüksek": ..}"""
+    data = await _query(mac_address, [0x53, 0x01], min_len=3)
+    return dict(zip(GLUCOSE_LEVELS, data[:3]))
+
+
+async def write_glucose_thresholds(mac_address, low: int, normal: int, high: int):
+    await _write(mac_address, [0x53, 0x02, low, normal, high])
+
+
+async def read_temperature_thresholds(mac_address) -> dict:
+    """Döner: {"Düşük": .., "Yüksek": ..}"""
+    data = await _query(mac_address, [0x54, 0x01], min_len=2)
+    return dict(zip(TEMPERATURE_LEVELS, data[:2]))
+
+
+async def write_temperature_thresholds(mac_address, low: int, high: int):
+    await _write(mac_address, [0x54, 0x02, low, high])
+
+
+# ---------- Titreşim ----------
+
+async def read_vibration_status(mac_address) -> bool:
+    data = await _query(mac_address, [0x55, 0x01])
+    return data[0] == 1
+
+
+async def write_vibration_status(mac_address, enabled: bool):
+    await _write(mac_address, [0x55, 0x02, 0x01 if enabled else 0x00])
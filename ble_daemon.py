@@ -0,0 +1,503 @@
+# ble_daemon.py
+# Yerel çoklama servisi: BLE bağlantılarının tek sahibi.
+# WIZEPOD tek merkezi bağlantı kabul ettiği için GUI, test.py betikleri ve test
+# düzeneği sırayla bağlanıp kopmak yerine bu servise Unix soketi üzerinden bağlanır.
+# Servis her cihaz için tek bir kalıcı Wizepod oturumu tutar:
+#   - ham komutlar (send) cihazın ble_scheduler kuyruğundan geçer,
+#   - ble_core fonksiyonları (call) paylaşılan istemciyi ödünç alır; onlar da aynı
+#     kuyruktan geçer, böylece hattaki send komutlarıyla iç içe girmez,
+#   - abone olan her istemciye indicate akışı dağıtılır,
+#   - batarya seviyesi bağlantı üzerinden izlenir, istemciler önbelleği okur (battery).
+#
+# Protokol: satır başına bir JSON nesnesi.
+#   istek : {"id": 1, "op": "send", "mac": "..", "cmd": [80, 1, 13, 10], "timeout": 5}
+#   cevap : {"id": 1, "ok": true, "result": ...}  /  {"id": 1, "ok": false, "error": ".."}
+#   olay  : {"event": "frame", "mac": "..", "t_ns": .., "data": [..]}   (subscribe sonrası)
+#           {"event": "closed", "mac": ".."}   (bağlantı kapandı; abonelik sona erdi)
+# İşlemler: connect, send, call, read, services, battery, subscribe, unsubscribe, status, disconnect
+# disconnect istemci başına sayılır: bağlantı, onu tutan (connect/subscribe eden)
+# son istemci bıraktığında kapanır.
+#
+# Çalıştırma: python ble_daemon.py [--socket YOL]
+import asyncio
+import json
+import os
+import tempfile
+
+from ble_scheduler import BACKGROUND, INTERACTIVE, PROVISIONING, LinkScheduler
+
+SOCKET_PATH = os.environ.get("WIZEPOD_SOCKET") or os.path.join(tempfile.gettempdir(), "wizepod.sock")
+
+PRIORITIES = {"interactive": INTERACTIVE, "provisioning": PROVISIONING, "background": BACKGROUND}
+
+_PUMP_INTERVAL = 0.005
+_MAX_CLIENT_BUFFER = 1 << 20   # yavaş aboneye en fazla bu kadar olay biriktirilir
+
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return list(bytes(value))
+    if isinstance(value, tuple):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return value
+
+
+class _Conn:
+    """Servise bağlı tek bir istemci."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.dropped = 0
+
+    def push(self, message: dict, droppable=False):
+        # Olaylar okumayan istemci yüzünden belleği şişirmesin; cevaplar hiç düşürülmez
+        if droppable and self.writer.transport.get_write_buffer_size() > _MAX_CLIENT_BUFFER:
+            self.dropped += 1
+            return
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+
+class _Link:
+    """Tek cihaza kalıcı bağlantı: oturum, komut kuyruğu ve aboneler."""
+
+    def __init__(self, session):
+        self.session = session
+        self.scheduler = LinkScheduler(session)
+        self.subscribers = set()
+        self.holders = set()   # connect/subscribe ile bağlantıyı tutan istemciler
+        self.battery = None
+        self._pump = None
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.session.client.is_connected)
+
+    def subscribe(self, conn):
+        self.subscribers.add(conn)
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.ensure_future(self._run_pump())
+
+    def unsubscribe(self, conn):
+        self.subscribers.discard(conn)
+
+    async def watch_battery(self):
+        """Batarya izleyicisini (ilk istekte) başlatır; sorgular kuyruktan arka planda geçer."""
+        if self.battery is None:
+            from ble_battery import BATTERY_LEVEL_UUID, BatteryMonitor
+            client, scheduler = self.session.client, self.scheduler
+            self.battery = BatteryMonitor(
+                self.session,
+                read=lambda: scheduler.call(lambda: client.read_gatt_char(BATTERY_LEVEL_UUID),
+                                            priority=BACKGROUND),
+                busy=lambda: any(n for p, n in scheduler.pending().items() if p != BACKGROUND),
+            )
+            await self.battery.start()
+        return self.battery
+
+    async def _run_pump(self):
+        # Komut cevapları dahil tüm indicate çerçeveleri abonelere dağıtılır
+        reader = self.session.frames()
+        while self.subscribers:
+            frames = reader.read()
+            if not frames:
+                await asyncio.sleep(_PUMP_INTERVAL)
+                continue
+            mac = self.session.addr
+            for seq, t_ns, data in frames:
+                event = {"event": "frame", "mac": mac, "t_ns": t_ns, "data": list(data)}
+                for conn in list(self.subscribers):
+                    conn.push(event, droppable=True)
+
+    async def close(self):
+        import ble_core
+        # Aboneler akışın bittiğini öğrensin; aksi halde sessizce olay gelmez olur
+        event = {"event": "closed", "mac": self.session.addr}
+        for conn in self.subscribers:
+            conn.push(event)
+        self.subscribers.clear()
+        self.holders.clear()
+        if self._pump is not None:
+            self._pump.cancel()
+        if self.battery is not None:
+            await self.battery.stop()
+        await self.scheduler.stop()
+        ble_core.unshare_client(self.session.addr)
+        try:
+            await self.session.disconnect()
+        except Exception as e:
+            print("Bağlantı kapatma hatası:", e)
+
+
+class WizepodDaemon:
+    """
+    :param path: Unix soket yolu
+    :param session_factory: mac → Wizepod oturumu (varsayılan gerçek BLE; test için sahte istemci)
+    """
+
+    def __init__(self, path=SOCKET_PATH, session_factory=None):
+        self.path = path
+        self.session_factory = session_factory or self._make_session
+        self.links = {}
+        self._link_locks = {}
+        self._conns = set()
+        self._server = None
+
+    @staticmethod
+    def _make_session(mac_address):
+        from wizepod import Wizepod
+        return Wizepod(mac_address)
+
+    async def start(self):
+        if os.path.exists(self.path):
+            # Soket cevap veriyorsa başka bir servis çalışıyordur; yolunu silmeyiz
+            try:
+                _, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                os.remove(self.path)   # önceki çalışmadan kalan soket
+            else:
+                writer.close()
+                raise RuntimeError(f"WIZEPOD servisi zaten çalışıyor: {self.path}")
+        self._server = await asyncio.start_unix_server(self._handle, self.path)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        print(f"WIZEPOD servisi dinliyor: {self.path}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for conn in list(self._conns):
+            conn.writer.close()
+        for mac in list(self.links):
+            await self._drop(mac)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def link(self, mac_address) -> _Link:
+        """Cihazın bağlantısını döner; yoksa (veya koptuysa) bir kez bağlanır."""
+        lock = self._link_locks.setdefault(mac_address, asyncio.Lock())
+        async with lock:
+            link = self.links.get(mac_address)
+            if link is not None and link.connected:
+                return link
+            holders = set()
+            if link is not None:
+                # Koptu: aboneler "closed" alır, tutan istemciler yeni bağlantıya aktarılır
+                holders = set(link.holders)
+                await self._drop(mac_address)
+            import ble_core
+            session = self.session_factory(mac_address)
+            await session.connect()
+            ble_core.share_client(mac_address, session.client)
+            link = self.links[mac_address] = _Link(session)
+            link.holders |= holders
+            return link
+
+    async def _drop(self, mac_address):
+        link = self.links.pop(mac_address, None)
+        if link is not None:
+            await link.close()
+
+    # ---------- İstemci bağlantıları ----------
+
+    async def _handle(self, reader, writer):
+        conn = _Conn(writer)
+        self._conns.add(conn)
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    conn.push({"id": None, "ok": False, "error": "Geçersiz JSON"})
+                    continue
+                # Her istek ayrı görev: yavaş bir komut aynı istemcinin diğerlerini bekletmez
+                task = asyncio.ensure_future(self._dispatch(conn, msg))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            for link in self.links.values():
+                link.unsubscribe(conn)
+                link.holders.discard(conn)
+            self._conns.discard(conn)
+            writer.close()
+
+    async def _dispatch(self, conn, msg):
+        req_id = msg.get("id")
+        handler = getattr(self, "_op_" + str(msg.get("op")), None)
+        try:
+            if handler is None:
+                raise ValueError(f"Bilinmeyen işlem: {msg.get('op')}")
+            result = await handler(conn, msg)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            conn.push({"id": req_id, "ok": False, "error": str(e) or type(e).__name__})
+        else:
+            conn.push({"id": req_id, "ok": True, "result": _jsonable(result)})
+
+    # ---------- İşlemler ----------
+
+    async def _op_connect(self, conn, msg):
+        link = await self.link(msg["mac"])
+        link.holders.add(conn)
+        return {"mtu": link.session.mtu}
+
+    @staticmethod
+    def _priority(msg, default="interactive"):
+        priority = PRIORITIES.get(msg.get("priority", default))
+        if priority is None:
+            raise ValueError(f"Bilinmeyen öncelik sınıfı: {msg.get('priority')}")
+        return priority
+
+    async def _op_services(self, conn, msg):
+        """Bağlı cihazın karakteristik UUID'leri."""
+        link = await self.link(msg["mac"])
+        services = getattr(link.session.client, "services", None) or []
+        return [char.uuid for service in services for char in service.characteristics]
+
+    async def _op_send(self, conn, msg):
+        link = await self.link(msg["mac"])
+        priority = self._priority(msg)
+        return await link.scheduler.send(
+            msg["cmd"], priority=priority, key=msg.get("key"), timeout=msg.get("timeout", 5.0),
+        )
+
+    async def _op_call(self, conn, msg):
+        """ble_core'daki read_*/write_* fonksiyonlarını kalıcı bağlantı üzerinden çağırır."""
+        import ble_core
+        name = msg["fn"]
+        fn = getattr(ble_core, name, None)
+        if not name.startswith(("read_", "write_")) or not asyncio.iscoroutinefunction(fn):
+            raise ValueError(f"Bilinmeyen komut: {name}")
+        priority = self._priority(msg)
+        link = await self.link(msg["mac"])
+        mac, args = msg["mac"], msg.get("args", [])
+        return await link.scheduler.call(lambda: fn(mac, *args), priority=priority, key=msg.get("key"))
+
+    async def _op_read(self, conn, msg):
+        """GATT karakteristiğini okur (sürekli okuma); varsayılan arka plan önceliğinde."""
+        priority = self._priority(msg, "background")
+        link = await self.link(msg["mac"])
+        client, uuid = link.session.client, msg["uuid"]
+        return await link.scheduler.call(lambda: client.read_gatt_char(uuid), priority=priority,
+                                         key=msg.get("key"))
+
+    async def _op_battery(self, conn, msg):
+        """
+        Önbellekteki batarya seviyesi; BLE trafiği oluşturmaz ve bağlanmaz.
+        Döner: {"connected": .., "level": yüzde|None, "mode": "notify"|"poll"|None}
+        """
+        link = self.links.get(msg["mac"])
+        if link is None or not link.connected:
+            return {"connected": False, "level": None, "mode": None}
+        battery = await link.watch_battery()
+        return {"connected": True, "level": battery.level, "mode": battery.mode}
+
+    async def _op_subscribe(self, conn, msg):
+        link = await self.link(msg["mac"])
+        link.holders.add(conn)
+        link.subscribe(conn)
+        return True
+
+    async def _op_unsubscribe(self, conn, msg):
+        link = self.links.get(msg["mac"])
+        if link is not None:
+            link.unsubscribe(conn)
+        return True
+
+    async def _op_status(self, conn, msg):
+        return {
+            mac: {
+                "connected": link.connected,
+                "mtu": link.session.mtu,
+                "subscribers": len(link.subscribers),
+                "holders": len(link.holders),
+                "pending": sum(link.scheduler.pending().values()),
+            }
+            for mac, link in self.links.items()
+        }
+
+    async def _op_disconnect(self, conn, msg):
+        """
+        İstemcinin bağlantıyı bırakması. Başka istemciler tutuyorsa bağlantı açık kalır.
+        Döner: bağlantı kapandıysa True
+        """
+        link = self.links.get(msg["mac"])
+        if link is None:
+            return True
+        link.unsubscribe(conn)
+        link.holders.discard(conn)
+        if link.holders:
+            return False
+        await self._drop(msg["mac"])
+        return True
+
+
+class DaemonClient:
+    """
+    Servise bağlanan istemci. Bağlantı maliyeti yoktur; cihaz servis tarafında açık kalır.
+
+        async with DaemonClient() as d:
+            raw = await d.send(mac, [0x50, 0x01, 0x0D, 0x0A])
+            yaz, don = await d.call(mac, "read_versions")
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self._reader = None
+        self._writer = None
+        self._task = None
+        self._next_id = 0
+        self._waiting = {}
+        self._subscriptions = {}
+        self._on_close = {}
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=1 << 20)
+        self._task = asyncio.ensure_future(self._read_loop())
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def connected(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                if "event" in msg:
+                    if msg["event"] == "closed":
+                        self._subscriptions.pop(msg["mac"], None)
+                        on_close = self._on_close.pop(msg["mac"], None)
+                        if on_close is not None:
+                            on_close()
+                        continue
+                    callback = self._subscriptions.get(msg["mac"])
+                    if callback is not None:
+                        callback(msg["t_ns"], bytes(msg["data"]))
+                    continue
+                future = self._waiting.pop(msg.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if msg["ok"]:
+                    future.set_result(msg["result"])
+                else:
+                    future.set_exception(RuntimeError(msg["error"]))
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Servis bağlantısı kapandı."))
+            self._waiting.clear()
+
+    async def request(self, op, **fields):
+        """Ham istek gönderir. Döner: servisin `result` alanı; hata durumunda RuntimeError."""
+        if not self.connected:
+            raise ConnectionError("Servis bağlantısı kapandı.")
+        self._next_id += 1
+        req_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[req_id] = future
+        self._writer.write(json.dumps({"id": req_id, "op": op, **fields}).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def connect_device(self, mac_address) -> dict:
+        return await self.request("connect", mac=mac_address)
+
+    async def send(self, mac_address, cmd_bytes, timeout=5.0, priority="interactive", key=None) -> bytes:
+        raw = await self.request("send", mac=mac_address, cmd=list(cmd_bytes),
+                                 timeout=timeout, priority=priority, key=key)
+        return bytes(raw)
+
+    async def call(self, mac_address, fn_name, *args, priority="interactive"):
+        """ble_core fonksiyonunu servis üzerinden çağırır (ör. "read_glucose_thresholds")."""
+        return await self.request("call", mac=mac_address, fn=fn_name, args=list(args),
+                                  priority=priority)
+
+    async def read(self, mac_address, char_uuid, priority="background") -> bytes:
+        """Karakteristiği servisin kalıcı bağlantısı üzerinden okur."""
+        return bytes(await self.request("read", mac=mac_address, uuid=char_uuid, priority=priority))
+
+    async def services(self, mac_address) -> list:
+        return await self.request("services", mac=mac_address)
+
+    async def battery(self, mac_address) -> dict:
+        """Servisin önbelleğindeki batarya durumu (bkz. _op_battery)."""
+        return await self.request("battery", mac=mac_address)
+
+    async def subscribe(self, mac_address, callback, on_close=None):
+        """
+        callback(t_ns, veri) cihazdan gelen her indicate çerçevesi için çağrılır.
+        on_close() servis bağlantıyı kapattığında (abonelik sona erdiğinde) çağrılır.
+        """
+        self._subscriptions[mac_address] = callback
+        if on_close is not None:
+            self._on_close[mac_address] = on_close
+        return await self.request("subscribe", mac=mac_address)
+
+    async def unsubscribe(self, mac_address):
+        self._subscriptions.pop(mac_address, None)
+        self._on_close.pop(mac_address, None)
+        return await self.request("unsubscribe", mac=mac_address)
+
+    async def status(self) -> dict:
+        return await self.request("status")
+
+    async def disconnect_device(self, mac_address) -> bool:
+        """Bağlantıyı bırakır. Döner: servis bağlantıyı kapattıysa True (başka tutan yoksa)."""
+        return await self.request("disconnect", mac=mac_address)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="WIZEPOD BLE çoklama servisi")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix soket yolu")
+    args = parser.parse_args()
+    daemon = WizepodDaemon(args.socket)
+    try:
+        asyncio.run(daemon.serve_forever())
+    except KeyboardInterrupt:
+        print("Servis durduruldu.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# ble_index.py
+# Kayıtlar için zaman aralığı indeksi (yan dosya: <kayıt>.idx).
+# Her chunk için zaman sınırları, dosya içi bayt ofseti ve min/max/ortalama
+# özetleri tutulur. Böylece "son 10 dakika" gibi sorgular dosyayı baştan
+# taramadan doğrudan ilgili ofsete gider; uzaklaştırılmış grafikler ham
+# örneklere hiç dokunmadan özetlerden çizilebilir.
+#
+# Dosya yapısı: [b"WZI1", indekslenen_bayt(q)] + kayıtlar
+# Kayıt: [ofset(q), t_başlangıç(q), t_bitiş(q), adet(I), min(d), max(d), ort(d)]
+import collections
+import csv
+import io
+import math
+import os
+import struct
+
+INDEX_MAGIC = b"WZI1"
+INDEX_HEADER = struct.Struct("<4sq")
+INDEX_ENTRY = struct.Struct("<qqqIddd")
+
+IndexEntry = collections.namedtuple(
+    "IndexEntry", ["offset", "t_start", "t_end", "count", "min", "max", "mean"]
+)
+
+Summary = collections.namedtuple(
+    "Summary", ["t_start", "t_end", "count", "min", "max", "mean"]
+)
+
+
+def summarize(values):
+    """Döner: (min, max, ortalama); sayısal olmayan veri için NaN."""
+    numbers = []
+    for v in values:
+        try:
+            numbers.append(float(v))
+        except (TypeError, ValueError):
+            pass
+    if not numbers:
+        return math.nan, math.nan, math.nan
+    return min(numbers), max(numbers), sum(numbers) / len(numbers)
+
+
+class TimeIndex:
+    """Bir kayda ait yan indeks dosyası."""
+
+    def __init__(self, path):
+        self.path = path
+        self.covered = 0
+        self.entries = []
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "rb") as f:
+            header = f.read(INDEX_HEADER.size)
+            if len(header) < INDEX_HEADER.size:
+                return
+            magic, covered = INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC:
+                return
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        self.entries = [IndexEntry(*e) for e in INDEX_ENTRY.iter_unpack(data[:usable])]
+        self.covered = covered
+
+    def reset(self):
+        self.entries = []
+        self.covered = 0
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def add(self, entry: IndexEntry, covered: int):
+        """Yeni chunk kaydını ekler ve indekslenen bayt sayısını günceller."""
+        new_file = not os.path.isfile(self.path)
+        with open(self.path, "wb" if new_file else "r+b") as f:
+            if new_file:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, 0))
+            f.seek(0, os.SEEK_END)
+            f.write(INDEX_ENTRY.pack(*entry))
+            f.seek(0)
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, covered))
+        self.entries.append(entry)
+        self.covered = covered
+
+    def locate(self, start=None, end=None):
+        """[start, end] ile kesişen chunk kayıtları (zaman sırasına göre)."""
+        return [
+            e for e in self.entries
+            if (start is None or e.t_end >= start) and (end is None or e.t_start <= end)
+        ]
+
+    def summaries(self, start=None, end=None, max_points=None):
+        """
+        Aralık için chunk özetleri. max_points verilirse komşu chunk'lar
+        birleştirilerek en fazla o kadar nokta döner (grafik uzaklaştırma).
+        """
+        entries = self.locate(start, end)
+        if not max_points or len(entries) <= max_points:
+            return [Summary(e.t_start, e.t_end, e.count, e.min, e.max, e.mean) for e in entries]
+        group = math.ceil(len(entries) / max_points)
+        return [_merge(entries[i:i + group]) for i in range(0, len(entries), group)]
+
+
+def _merge(entries):
+    numeric = [e for e in entries if not math.isnan(e.mean)]
+    count = sum(e.count for e in entries)
+    if not numeric:
+        return Summary(entries[0].t_start, entries[-1].t_end, count, math.nan, math.nan, math.nan)
+    n = sum(e.count for e in numeric)
+    return Summary(
+        entries[0].t_start, entries[-1].t_end, count,
+        min(e.min for e in numeric), max(e.max for e in numeric),
+        sum(e.mean * e.count for e in numeric) / n,
+    )
+
+
+def index_path(record_path):
+    return record_path + ".idx"
+
+
+# ---------- CSV kayıtları (bluetooth_data.csv) ----------
+
+class CsvIndex:
+    """
+    [Zaman, Veri] CSV kaydı için indeks. refresh() yalnızca son indekslenen
+    bayttan sonrasını tarar; kayıt sürerken tekrar tekrar çağrılabilir.
+    """
+
+    def __init__(self, csv_path, rows_per_chunk=1000):
+        self.csv_path = csv_path
+        self.rows_per_chunk = rows_per_chunk
+        self.index = TimeIndex(index_path(csv_path))
+
+    def refresh(self):
+        if not os.path.isfile(self.csv_path):
+            return self.index
+        size = os.path.getsize(self.csv_path)
+        if size < self.index.covered:
+            # Dosya kısaldı / yeniden yazıldı → baştan kur
+            self.index.reset()
+        with open(self.csv_path, "rb") as f:
+            f.seek(self.index.covered)
+            offset = self.index.covered
+            chunk_offset, times, values = offset, [], []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # yazılmakta olan yarım satır
+                row = _parse_row(line)
+                offset += len(line)
+                if row is None:
+                    if not times:
+                        chunk_offset = offset
+                    continue
+                times.append(row[0])
+                values.append(row[1])
+                if len(times) >= self.rows_per_chunk:
+                    self._add(chunk_offset, times, values, offset)
+                    chunk_offset, times, values = offset, [], []
+            # Yarım chunk indekslenmez; bir sonraki refresh'te tamamlanır
+        return self.index
+
+    def _add(self, offset, times, values, covered):
+        lo, hi, mean = summarize(values)
+        self.index.add(
+            IndexEntry(offset, int(min(times) * 1000), int(max(times) * 1000),
+                       len(times), lo, hi, mean),
+            covered,
+        )
+
+    def read_range(self, start_s=None, end_s=None):
+        """
+        [start_s, end_s] aralığındaki satırları döner: [(zaman, veri), ...].
+        İndekslenen kısımda yalnızca ilgili chunk'lar okunur, kalan kuyruk taranır.
+        """
+        self.refresh()
+        start_ms = None if start_s is None else int(start_s * 1000)
+        end_ms = None if end_s is None else int(end_s * 1000)
+        rows = []
+        with open(self.csv_path, "rb") as f:
+            entries = self.index.entries
+            for pos, e in enumerate(entries):
+                if (start_ms is not None and e.t_end < start_ms) or \
+                        (end_ms is not None and e.t_start > end_ms):
+                    continue
+                stop = entries[pos + 1].offset if pos + 1 < len(entries) else self.index.covered
+                f.seek(e.offset)
+                rows.extend(_parse_block(f.read(stop - e.offset)))
+            f.seek(self.index.covered)
+            rows.extend(_parse_block(f.read()))
+        lo = -math.inf if start_s is None else start_s
+        hi = math.inf if end_s is None else end_s
+        return [r for r in rows if lo <= r[0] <= hi]
+
+
+def _parse_row(line: bytes):
+    try:
+        fields = next(csv.reader([line.decode("utf-8", errors="ignore")]))
+        return float(fields[0]), fields[1] if len(fields) > 1 else ""
+    except (StopIteration, ValueError):
+        return None  # başlık veya bozuk satır
+
+
+def _parse_block(data: bytes):
+    rows = []
+    for fields in csv.reader(io.StringIO(data.decode("utf-8", errors="ignore"))):
+        try:
+            rows.append((float(fields[0]), fields[1] if len(fields) > 1 else ""))
+        except (IndexError, ValueError):
+            continue
+    return rows
@@ -0,0 +1,106 @@
+# ble_ingest.py
+# Kayıt/UI öncesi değişim algılama aşaması.
+# Yavaş değişen glikoz/sıcaklık verisinde her örneği yazmak yerine yalnızca
+# değişimler (kanal başına ölü bant ile) ve belirli aralıklarla "heartbeat"
+# satırları geçirilir. Aradaki tekrarlar sayılır (run-length), zaman damgası
+# kaybolmaz: bir değer bir sonraki geçişe kadar geçerlidir.
+import collections
+
+CHANGE    = "change"
+HEARTBEAT = "heartbeat"
+
+IngestEvent = collections.namedtuple(
+    "IngestEvent", ["channel", "t", "value", "kind", "run_length"]
+)
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _ChannelState:
+    __slots__ = ("value", "number", "t_emit", "t_last", "last_value", "run_length")
+
+    def __init__(self):
+        self.value = None        # ölü bant referansı (son geçen değişim)
+        self.number = None
+        self.t_emit = None
+        self.t_last = None
+        self.last_value = None   # son ham örnek (bastırılmış olabilir)
+        self.run_length = 0
+
+
+class ChangeDetector:
+    """
+    :param deadband: {kanal: mutlak eşik} — sayısal kanallarda bu kadar değişim yok sayılır
+    :param default_deadband: sözlükte olmayan kanallar için eşik (0 → her değişim)
+    :param heartbeat: değişim olmasa da bu kadar saniyede bir örnek geçirilir
+    """
+
+    def __init__(self, deadband=None, default_deadband=0.0, heartbeat=60.0):
+        self.deadband = dict(deadband or {})
+        self.default_deadband = default_deadband
+        self.heartbeat = heartbeat
+        self._channels = {}
+        self.received = 0
+        self.emitted = 0
+
+    def _changed(self, state, channel, value, number):
+        if state.value is None:
+            return True
+        band = self.deadband.get(channel, self.default_deadband)
+        if number is not None and state.number is not None:
+            return abs(number - state.number) > band
+        return value != state.value
+
+    def feed(self, channel, t, value):
+        """
+        Bir örnek işler.
+        Döner: geçirilecekse IngestEvent, bastırıldıysa None.
+        run_length: bu olaydan önce bastırılan örnek sayısı
+        """
+        self.received += 1
+        state = self._channels.get(channel)
+        if state is None:
+            state = self._channels[channel] = _ChannelState()
+        number = _as_number(value)
+        state.t_last = t
+        state.last_value = value
+
+        if self._changed(state, channel, value, number):
+            kind = CHANGE
+            # Ölü bant referansı yalnızca geçişte güncellenir (yavaş kaymalar birikir)
+            state.value, state.number = value, number
+        elif self.heartbeat is not None and t - state.t_emit >= self.heartbeat:
+            kind = HEARTBEAT
+        else:
+            state.run_length += 1
+            return None
+
+        event = IngestEvent(channel, t, value, kind, state.run_length)
+        state.t_emit = t
+        state.run_length = 0
+        self.emitted += 1
+        return event
+
+    def flush(self, channel):
+        """
+        Kanalın bastırılmış son örneğini (varsa) heartbeat olarak döner.
+        Kayıt durdurulurken son değerin bitiş zamanını saklamak için kullanılır.
+        """
+        state = self._channels.get(channel)
+        if state is None or state.run_length == 0:
+            return None
+        # Referans değil son ham örnek: ölü bant içindeki kayma da kayda geçer
+        event = IngestEvent(channel, state.t_last, state.last_value, HEARTBEAT, state.run_length - 1)
+        state.t_emit = state.t_last
+        state.run_length = 0
+        self.emitted += 1
+        return event
+
+    def ratio(self) -> float:
+        """Geçirilen / alınan örnek oranı."""
+        return self.emitted / self.received if self.received else 1.0
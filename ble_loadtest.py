@@ -0,0 +1,428 @@
+# ble_loadtest.py
+# Sanal cihaz filosu ile yük testi.
+# BleakClient arayüzünü taklit eden sanal WIZEPOD'lar (her birinin kendi gecikme,
+# kayıp ve kopma davranışı) komut katmanına takılır; tarama, bağlanma, anlık
+# okuma (snapshot), ayar yazma (provision) ve akış (stream) iş yükleri cihaz
+# sayısı arttıkça çalıştırılır. Rapor: toplam verim, gecikme yüzdelikleri,
+# bellek (tracemalloc tepe) ve CPU kullanımı.
+#
+# Sanal cihazlar ble_core.share_client ile kaydedilir; ble_core fonksiyonları
+# gerçek BLE yerine onları kullanır. Akış iş yükü Wizepod oturumu üzerinden çalışır.
+#
+# Çalıştırma: python ble_loadtest.py --devices 50 100 200 --loss 0.01
+import asyncio
+import random
+import struct
+import time
+import tracemalloc
+
+import ble_core
+from ble_trace import StageStats, now_ns
+from wizepod import INDICATE_UUID, Wizepod
+
+WORKLOADS = ("scan", "connect", "snapshot", "provision", "stream")
+
+STREAM_OPCODE = 0x60
+_STREAM_FRAME = struct.Struct("<BIq")   # opcode, sıra, gönderim_ns
+
+
+class VirtualDevice:
+    """
+    Sanal cihaz davranışı.
+
+    :param latency: işlem başına ortalama gecikme (saniye)
+    :param jitter: gecikmenin standart sapması
+    :param loss: bir cevabın/bildirimin kaybolma olasılığı
+    :param disconnect: her işlemde bağlantının kopma olasılığı
+    """
+
+    def __init__(self, address, name="WIZEPOD", latency=0.02, jitter=0.005, loss=0.0,
+                 disconnect=0.0, seed=None):
+        self.address = address
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.disconnect = disconnect
+        self.random = random.Random(seed)
+        # Cihaz tarafı ayarlar (ble_core komut tablosu)
+        self.registers = {
+            0x50: [3, 1], 0x51: [0x10], 0x52: [0x20], 0x53: [70, 100, 180],
+            0x54: [35, 38], 0x55: [1],
+        }
+
+    def delay(self):
+        return max(0.0, self.random.gauss(self.latency, self.jitter))
+
+    def lost(self):
+        return self.random.random() < self.loss
+
+    def drops(self):
+        return self.random.random() < self.disconnect
+
+    def handle(self, payload: bytes):
+        """Komutu uygular. Döner: cevap baytları (yazma komutlarında None)."""
+        group, op = payload[0], payload[1] if len(payload) > 1 else 0x01
+        regs = self.registers.setdefault(group, [0])
+        if op == 0x01:
+            return bytes(regs)
+        if group == 0x50:
+            regs[op - 0x02] = payload[2]   # 0x02 yazılım, 0x03 donanım
+        else:
+            regs[:] = payload[2:]
+        return None
+
+
+class _Advertisement:
+    """BleakScanner.discover() sonucundaki BLEDevice yerine."""
+
+    def __init__(self, address, name):
+        self.address = address
+        self.name = name
+
+
+class VirtualClient:
+    """Sanal cihaza bağlanan BleakClient yerine geçen istemci."""
+
+    def __init__(self, device: VirtualDevice, mtu_size=247):
+        self.device = device
+        self.address = device.address
+        self.mtu_size = mtu_size
+        self.is_connected = False
+        self._notify = {}
+        self._pending_read = None
+        self._stream = None
+
+    async def _op(self):
+        if not self.is_connected:
+            raise ConnectionError("Cihaz bağlı değil.")
+        await asyncio.sleep(self.device.delay())
+        if self.device.drops():
+            self._drop()
+            raise ConnectionError("Bağlantı koptu.")
+
+    def _drop(self):
+        self.is_connected = False
+        self._notify.clear()
+        if self._stream is not None:
+            self._stream.cancel()
+            self._stream = None
+
+    async def connect(self):
+        await asyncio.sleep(self.device.delay() * 5)   # bağlantı kurma birkaç aralık sürer
+        if self.device.lost():
+            raise ConnectionError("Cihaza bağlanılamadı.")
+        self.is_connected = True
+
+    async def disconnect(self):
+        self._drop()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.disconnect()
+        return False
+
+    async def start_notify(self, uuid, callback):
+        await self._op()
+        self._notify[uuid.lower()] = callback
+
+    async def stop_notify(self, uuid):
+        self._notify.pop(uuid.lower(), None)
+
+    async def read_gatt_char(self, uuid):
+        await self._op()
+        data, self._pending_read = self._pending_read, None
+        if data is None or self.device.lost():
+            return bytearray()
+        return bytearray(data)
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        await self._op()
+        data = bytes(data)
+        if data and data[0] == STREAM_OPCODE:
+            self.start_stream(data[1] if len(data) > 1 else 10)
+            return
+        reply = self.device.handle(data)
+        if reply is None or self.device.lost():
+            return
+        uuid = uuid.lower()
+        if uuid == ble_core.WRITE_UUID.lower():
+            self._pending_read = reply   # ble_core._query: yaz → bekle → oku
+        else:
+            # indicate cevabı: ble_core versiyon sorgusu veya Wizepod oturumu
+            for callback in list(self._notify.values()):
+                asyncio.get_running_loop().call_later(self.device.delay(), callback, None,
+                                                      bytearray(reply))
+
+    def start_stream(self, rate_hz):
+        """Cihazın `rate_hz` hızında sıra numaralı ölçüm bildirimleri göndermesi."""
+        if self._stream is not None:
+            self._stream.cancel()
+        self._stream = asyncio.ensure_future(self._run_stream(rate_hz))
+
+    async def _run_stream(self, rate_hz):
+        period = 1.0 / rate_hz
+        loop = asyncio.get_running_loop()
+        seq = 0
+        next_t = loop.time()
+        while self.is_connected:
+            seq += 1
+            callback = self._notify.get(INDICATE_UUID.lower())
+            if callback is not None and not self.device.lost():
+                frame = bytearray(_STREAM_FRAME.pack(STREAM_OPCODE, seq, now_ns()))
+                loop.call_later(self.device.delay(), callback, None, frame)
+            next_t += period
+            await asyncio.sleep(max(0.0, next_t - loop.time()))
+
+
+class Fleet:
+    """Sanal cihaz filosu."""
+
+    def __init__(self, count, latency=0.02, jitter=0.005, loss=0.0, disconnect=0.0, seed=0):
+        self.devices = [
+            VirtualDevice(f"AA:00:00:00:{i // 256:02X}:{i % 256:02X}", latency=latency,
+                          jitter=jitter, loss=loss, disconnect=disconnect, seed=seed + i)
+            for i in range(count)
+        ]
+        self.clients = {d.address: VirtualClient(d) for d in self.devices}
+
+    async def discover(self, timeout=1.0):
+        """BleakScanner.discover() yerine: her cihaz bir reklam aralığı içinde görülür."""
+        found = []
+
+        async def advertise(device):
+            await asyncio.sleep(min(timeout, device.random.uniform(0, timeout / 2)))
+            if not device.lost():
+                found.append(_Advertisement(device.address, device.name))
+
+        await asyncio.gather(*(advertise(d) for d in self.devices))
+        return found
+
+    def share(self):
+        for address, client in self.clients.items():
+            ble_core.share_client(address, client)
+
+    def unshare(self):
+        for address in self.clients:
+            ble_core.unshare_client(address)
+
+
+class WorkloadResult:
+    def __init__(self, name, devices):
+        self.name = name
+        self.devices = devices
+        self.latency = StageStats(window=1 << 16)
+        self.ops = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_kib = 0.0
+
+    def row(self) -> dict:
+        s = self.latency.summary()
+        return {
+            "iş yükü": self.name, "cihaz": self.devices, "işlem": self.ops, "hata": self.errors,
+            "yeniden bağlanma": self.reconnects,
+            "işlem/s": self.ops / self.wall_s if self.wall_s else 0.0,
+            "p50 ms": s["p50_ms"], "p99 ms": s["p99_ms"], "max ms": s["max_ms"],
+            "CPU %": 100.0 * self.cpu_s / self.wall_s if self.wall_s else 0.0,
+            "bellek KiB": self.peak_kib,
+        }
+
+
+async def _timed(result, coro):
+    t0 = now_ns()
+    try:
+        await coro
+    except (ConnectionError, TimeoutError, ValueError, asyncio.TimeoutError):
+        result.errors += 1
+        return False
+    result.latency.add(now_ns() - t0)
+    result.ops += 1
+    return True
+
+
+async def _ensure_connected(fleet, address, result, attempts=3):
+    client = fleet.clients[address]
+    for _ in range(attempts):
+        if client.is_connected:
+            return True
+        result.reconnects += 1
+        try:
+            await client.connect()
+        except ConnectionError:
+            continue
+    return client.is_connected
+
+
+async def _run_scan(fleet, result, rounds=3, **_):
+    for _ in range(rounds):
+        found = []
+
+        async def scan():
+            found.extend(await fleet.discover())
+
+        await _timed(result, scan())
+        result.errors += len(fleet.devices) - len(found)
+
+
+async def _run_connect(fleet, result, **_):
+    async def connect(client):
+        await client.disconnect()
+        await client.connect()
+
+    await asyncio.gather(*(_timed(result, connect(c)) for c in fleet.clients.values()))
+
+
+async def _run_snapshot(fleet, result, rounds=2, **_):
+    readers = (
+        ble_core.read_versions, ble_core.read_calisma_suresi, ble_core.read_glucose_thresholds,
+        ble_core.read_temperature_thresholds, ble_core.read_vibration_status,
+    )
+
+    async def snapshot(address):
+        for _ in range(rounds):
+            for read in readers:
+                if await _ensure_connected(fleet, address, result):
+                    await _timed(result, read(address))
+
+    await asyncio.gather(*(snapshot(a) for a in fleet.clients))
+
+
+async def _run_provision(fleet, result, **_):
+    async def provision(address, i):
+        writes = (
+            ble_core.write_glucose_thresholds(address, 60 + i % 20, 100, 170 + i % 20),
+            ble_core.write_temperature_thresholds(address, 34, 39),
+            ble_core.write_calisma_suresi(address, 0x10 + i % 8),
+            ble_core.write_vibration_status(address, i % 2 == 0),
+        )
+        for write in writes:
+            if await _ensure_connected(fleet, address, result):
+                await _timed(result, write)
+            else:
+                write.close()
+
+    await asyncio.gather(*(provision(a, i) for i, a in enumerate(fleet.clients)))
+
+
+async def _run_stream(fleet, result, duration=5.0, rate_hz=20, **_):
+    """Her cihaz Wizepod oturumu üzerinden akış gönderir; gecikme gönderimden okumaya ölçülür."""
+    sessions = []
+
+    async def open_stream(address, client):
+        if not await _ensure_connected(fleet, address, result):
+            return
+        session = Wizepod(address, client=client)
+        try:
+            await client.start_notify(INDICATE_UUID, session._on_indicate)
+            await session.write(bytes([STREAM_OPCODE, rate_hz]))
+        except ConnectionError:
+            result.errors += 1
+            return
+        sessions.append((session, session.frames()))
+
+    # Akışlar aynı anda açılır; sırayla açmak ilk cihazların halkasını kurulum bitmeden taşırır
+    await asyncio.gather(*(open_stream(a, c) for a, c in fleet.clients.items()))
+    deadline = time.monotonic() + duration
+    expected = {}
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+        for session, reader in sessions:
+            for seq, t_arrival, data in reader.read_views():
+                if data[0] != STREAM_OPCODE:
+                    continue
+                _, frame_seq, t_sent = _STREAM_FRAME.unpack(data)
+                result.latency.add(t_arrival - t_sent)
+                result.ops += 1
+                expected[session.addr] = frame_seq
+    for session, _ in sessions:
+        session.client._drop()
+    # Kayıp: cihazın gönderdiği son sıraya göre alınmayan çerçeveler
+    result.errors += max(0, sum(expected.values()) - result.ops)
+
+
+_RUNNERS = {
+    "scan": _run_scan, "connect": _run_connect, "snapshot": _run_snapshot,
+    "provision": _run_provision, "stream": _run_stream,
+}
+
+
+async def run_workload(name, fleet, **options) -> WorkloadResult:
+    """Tek iş yükünü filoda çalıştırır; süre, CPU ve tepe belleği ölçer."""
+    if name not in _RUNNERS:
+        raise ValueError(f"Bilinmeyen iş yükü: {name}")
+    result = WorkloadResult(name, len(fleet.devices))
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        await _RUNNERS[name](fleet, result, **options)
+    finally:
+        result.wall_s = time.perf_counter() - wall0
+        result.cpu_s = time.process_time() - cpu0
+        result.peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+        if not tracing:
+            tracemalloc.stop()
+    return result
+
+
+async def run_sweep(device_counts, workloads=WORKLOADS, latency=0.02, jitter=0.005, loss=0.0,
+                    disconnect=0.0, **options):
+    """
+    Her cihaz sayısı için yeni filo kurar ve iş yüklerini sırayla çalıştırır.
+    Döner: [WorkloadResult.row(), ...]
+    """
+    rows = []
+    for count in device_counts:
+        fleet = Fleet(count, latency, jitter, loss, disconnect)
+        fleet.share()
+        try:
+            for name in workloads:
+                result = await run_workload(name, fleet, **options)
+                rows.append(result.row())
+        finally:
+            fleet.unshare()
+            for client in fleet.clients.values():
+                await client.disconnect()
+    return rows
+
+
+def format_rows(rows) -> str:
+    columns = ["iş yükü", "cihaz", "işlem", "hata", "yeniden bağlanma", "işlem/s",
+               "p50 ms", "p99 ms", "max ms", "CPU %", "bellek KiB"]
+    lines = ["  ".join(f"{c:>10}" for c in columns)]
+    for row in rows:
+        lines.append("  ".join(
+            f"{row[c]:>10.1f}" if isinstance(row[c], float) else f"{row[c]:>10}" for c in columns
+        ))
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Sanal WIZEPOD filosu ile yük testi")
+    parser.add_argument("--devices", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS), choices=WORKLOADS)
+    parser.add_argument("--latency", type=float, default=0.02, help="işlem gecikmesi (s)")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--loss", type=float, default=0.0, help="kayıp olasılığı")
+    parser.add_argument("--disconnect", type=float, default=0.0, help="işlem başına kopma olasılığı")
+    parser.add_argument("--duration", type=float, default=5.0, help="akış süresi (s)")
+    parser.add_argument("--rate", type=int, default=20, help="cihaz başına akış hızı (Hz)")
+    args = parser.parse_args()
+    rows = asyncio.run(run_sweep(
+        args.devices, args.workloads, args.latency, args.jitter, args.loss, args.disconnect,
+        duration=args.duration, rate_hz=args.rate,
+    ))
+    print(format_rows(rows))
+
+
+if __name__ == "__main__":
+    main()
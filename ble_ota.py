@@ -0,0 +1,219 @@
+# ble_ota.py
+# Wizepod oturumu üzerinden kablosuz firmware güncelleme (OTA).
+#
+# Akış (cihaz firmware'i ile uyumlu olmalı):
+#   1) [0x80, boyut(4), imaj_crc32(4), blok_boyu(2)]         → cevap [0x80, durum, devam_ofseti(4)]
+#   2) Her blok için başlık [0x81, ofset(4), uzunluk(2), blok_crc32(4)]
+#      ardından blok verisi 0x70 bulk çerçeveleri ile akıtılır (bkz. ble_bulk)
+#   3) Cihaz her blok için [0x82, durum, sonraki_ofset(4)] indicate eder
+#      (kümülatif onay; durum != 0 ise CRC hatası → son onaylı ofsetten tekrar)
+#   4) [0x83, imaj_crc32(4)]                                   → cevap [0x83, durum]
+# Bağlantı koparsa son onaylı ofset ota_state.json'a yazılır ve oradan devam edilir.
+import asyncio
+import json
+import os
+import sys
+import time
+import zlib
+
+from ble_bulk import BulkTransfer
+
+OTA_START = 0x80
+OTA_BLOCK = 0x81
+OTA_ACK   = 0x82
+OTA_END   = 0x83
+
+OTA_STATE_FILE = "ota_state.json"
+
+
+def _u32(value: int) -> list[int]:
+    return list(value.to_bytes(4, byteorder="little"))
+
+
+def _u16(value: int) -> list[int]:
+    return list(value.to_bytes(2, byteorder="little"))
+
+
+def _link_errors() -> tuple:
+    """Kopma sayılan hatalar; BleakError yalnızca bleak zaten yüklüyse eklenir (sahte istemciler için)."""
+    errors = (ConnectionError, TimeoutError, asyncio.TimeoutError)
+    bleak = sys.modules.get("bleak")
+    if bleak is not None:
+        errors += (bleak.BleakError,)
+    return errors
+
+
+class ThroughputMeter:
+    """Onaylanan bayt üzerinden anlık (EWMA) ve ortalama hız hesabı."""
+
+    def __init__(self, total: int, alpha: float = 0.3):
+        self.total = total
+        self.alpha = alpha
+        self.start = time.perf_counter()
+        self._last_t = self.start
+        self._last_bytes = 0
+        self.rate = 0.0
+
+    def update(self, acked: int) -> dict:
+        now = time.perf_counter()
+        dt = now - self._last_t
+        if dt > 0 and acked > self._last_bytes:
+            inst = (acked - self._last_bytes) / dt
+            self.rate = inst if self.rate == 0 else self.alpha * inst + (1 - self.alpha) * self.rate
+            self._last_t = now
+            self._last_bytes = acked
+        elapsed = now - self.start
+        remaining = self.total - acked
+        return {
+            "acked": acked,
+            "total": self.total,
+            "rate_bps": self.rate,
+            "avg_bps": acked / elapsed if elapsed > 0 else 0.0,
+            "eta_s": remaining / self.rate if self.rate > 0 else None,
+        }
+
+
+def load_resume_offset(mac_address, image_crc, path=OTA_STATE_FILE) -> int:
+    """Aynı imaj için daha önce onaylanmış son ofseti döner (yoksa 0)."""
+    if not os.path.isfile(path):
+        return 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f).get(mac_address, {})
+    except (OSError, ValueError):
+        return 0
+    if state.get("image_crc") != image_crc:
+        return 0
+    return int(state.get("offset", 0))
+
+
+def save_resume_offset(mac_address, image_crc, offset, path=OTA_STATE_FILE):
+    state = {}
+    if os.path.isfile(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+    if offset is None:
+        state.pop(mac_address, None)
+    else:
+        state[mac_address] = {"image_crc": image_crc, "offset": offset}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+class OtaUpdater:
+    """
+    Firmware imajını bloklar halinde, pencereli onaylarla gönderir.
+
+    :param session: bağlı Wizepod oturumu
+    :param block_size: CRC kontrolü yapılan blok boyu
+    :param window: onay beklemeden gönderilebilecek blok sayısı
+    :param progress: progress(dict) — ThroughputMeter.update çıktısı ile çağrılır
+    """
+
+    def __init__(self, session, block_size: int = 2048, window: int = 4,
+                 ack_timeout: float = 5.0, max_retries: int = 5, progress=None,
+                 state_path: str = OTA_STATE_FILE):
+        self.session = session
+        self.block_size = block_size
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.progress = progress
+        self.state_path = state_path
+        self._acked = 0
+        self._nak = False
+        self._ack_evt = asyncio.Event()
+
+    def _on_ack(self, frame: bytes):
+        if len(frame) < 6:
+            return
+        status = frame[1]
+        offset = int.from_bytes(frame[2:6], byteorder="little")
+        if status != 0:
+            self._nak = True
+        self._acked = max(self._acked, offset)
+        self._ack_evt.set()
+
+    async def _wait_ack(self, target: int):
+        while self._acked < target and not self._nak:
+            self._ack_evt.clear()
+            try:
+                await asyncio.wait_for(self._ack_evt.wait(), self.ack_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"OTA blok onayı gelmedi (ofset {target}).")
+
+    async def _start(self, image: bytes, image_crc: int) -> int:
+        cmd = [OTA_START] + _u32(len(image)) + _u32(image_crc) + _u16(self.block_size)
+        reply = await self.session.send(cmd)
+        if len(reply) < 6 or reply[0] != OTA_START or reply[1] != 0:
+            raise ValueError(f"OTA başlatılamadı (cevap: {reply.hex()})")
+        return int.from_bytes(reply[2:6], byteorder="little")
+
+    async def _stream(self, image: bytes, image_crc: int, offset: int, meter: ThroughputMeter):
+        view = memoryview(image)
+        sent = offset
+        # Kredi penceresi tüm akış boyunca bağlı kalır; bloklar arasında dönen krediler kaybolmaz
+        async with BulkTransfer(self.session) as transfer:
+            while self._acked < len(image):
+                if self._nak:
+                    # CRC hatası: son onaylı bloktan itibaren tekrar gönder
+                    self._nak = False
+                    sent = self._acked
+                # Pencere dolana kadar blok gönder
+                while sent < len(image) and sent - self._acked < self.window * self.block_size:
+                    block = view[sent:sent + self.block_size]
+                    header = [OTA_BLOCK] + _u32(sent) + _u16(len(block)) + _u32(zlib.crc32(block))
+                    await self.session.write(bytes(header))
+                    await transfer.send(block)
+                    sent += len(block)
+                await self._wait_ack(min(self._acked + self.block_size, len(image)))
+                save_resume_offset(self.session.addr, image_crc, self._acked, self.state_path)
+                if self.progress:
+                    self.progress(meter.update(self._acked))
+
+    async def update(self, image: bytes) -> dict:
+        """
+        İmajı gönderir; kopmalarda yeniden bağlanıp son onaylı ofsetten devam eder.
+        Döner: son hız/ilerleme bilgisi
+        """
+        image_crc = zlib.crc32(image)
+        meter = ThroughputMeter(len(image))
+        retries = 0
+        reconnect = False
+        while True:
+            self.session.add_listener(OTA_ACK, self._on_ack)
+            try:
+                if reconnect:
+                    # Yeniden bağlanma da denemenin parçası; başarısızsa sonraki denemeye kalır
+                    await self.session.connect()
+                    reconnect = False
+                device_offset = await self._start(image, image_crc)
+                local_offset = load_resume_offset(self.session.addr, image_crc, self.state_path)
+                # Cihazın ve yerel kaydın ortak kabul ettiği en küçük ofset
+                offset = min(device_offset, local_offset) if local_offset else device_offset
+                offset -= offset % self.block_size
+                self._acked, self._nak = offset, False
+                await self._stream(image, image_crc, offset, meter)
+                reply = await self.session.send([OTA_END] + _u32(image_crc), timeout=10.0)
+                if len(reply) < 2 or reply[0] != OTA_END or reply[1] != 0:
+                    raise ValueError("OTA imaj doğrulaması başarısız.")
+                save_resume_offset(self.session.addr, image_crc, None, self.state_path)
+                return meter.update(len(image))
+            except Exception as e:
+                if not isinstance(e, _link_errors()):
+                    raise
+                retries += 1
+                if retries > self.max_retries:
+                    raise
+                print(f"OTA kesildi ({e}), {self._acked} bayttan devam edilecek…")
+                try:
+                    await self.session.disconnect()
+                except Exception:
+                    pass
+                await asyncio.sleep(min(2 ** retries * 0.25, 5.0))
+                reconnect = True
+            finally:
+                self.session.remove_listener(OTA_ACK)
@@ -0,0 +1,186 @@
+# ble_ring.py
+# Ham BLE çerçeveleri için sabit boyutlu slotlardan oluşan halka tampon.
+# Tampon bir bytearray ya da multiprocessing.shared_memory bloğu olabilir;
+# paylaşımlı bellekte tek yazar (BLE süreci) ve birden çok okuyucu
+# (çözümleme/kayıt/analiz süreçleri) kilitsiz çalışır.
+#
+# Yerleşim:
+#   başlık : [yazma_sırası(Q), slot_sayısı(I), slot_boyu(I)]
+#   slot   : [sıra(Q), t_ns(q), uzunluk(H), veri...]
+# Sıra numaraları 1'den başlar; slot = (sıra - 1) % slot_sayısı.
+# Yazar slotun sıra alanını en son yazar, okuyucu kopyaladıktan sonra tekrar
+# kontrol eder; arada üzerine yazılmışsa çerçeve "kayıp" sayılır.
+#
+# Süreç içi kullanımda (Wizepod bildirimleri) okunmamış bir cevap `pinned` ile
+# korunabilir: halka o slota dolanacak kadar dolarsa yeni çerçeve düşürülür ve
+# `overruns` artar; cevap hiçbir zaman ezilmez.
+import struct
+
+RING_HEADER = struct.Struct("<QII")
+SLOT_HEADER = struct.Struct("<QqH")
+
+
+def ring_size(slots: int, slot_size: int) -> int:
+    """Verilen yerleşim için gereken toplam bayt."""
+    return RING_HEADER.size + slots * (SLOT_HEADER.size + slot_size)
+
+
+class FrameRing:
+    """Var olan bir tampon üzerinde halka. create/attach ile paylaşımlı bellekte açılır."""
+
+    def __init__(self, buf, slots=None, slot_size=None):
+        self.buf = memoryview(buf)
+        if slots is None:
+            _, slots, slot_size = RING_HEADER.unpack_from(self.buf, 0)
+        else:
+            if len(self.buf) < ring_size(slots, slot_size):
+                raise ValueError("Tampon halka yerleşimi için küçük.")
+            RING_HEADER.pack_into(self.buf, 0, 0, slots, slot_size)
+        self.slots = slots
+        self.slot_size = slot_size
+        self._stride = SLOT_HEADER.size + slot_size
+        self._shm = None
+        self.pinned = None
+        self.overruns = 0
+
+    @classmethod
+    def create(cls, slots=1024, slot_size=256):
+        """Yeni paylaşımlı bellek bloğunda halka oluşturur (sahip süreç)."""
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(create=True, size=ring_size(slots, slot_size))
+        ring = cls(shm.buf, slots, slot_size)
+        ring._shm = shm
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        """Başka bir sürecin oluşturduğu halkaya bağlanır."""
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=name)
+        ring = cls(shm.buf)
+        ring._shm = shm
+        return ring
+
+    @property
+    def name(self):
+        return self._shm.name if self._shm is not None else None
+
+    @property
+    def write_seq(self) -> int:
+        return RING_HEADER.unpack_from(self.buf, 0)[0]
+
+    def _slot_offset(self, seq: int) -> int:
+        return RING_HEADER.size + ((seq - 1) % self.slots) * self._stride
+
+    def push(self, data, t_ns: int):
+        """
+        Çerçeveyi bir sonraki slota kopyalar (tek kopya, yeni nesne yok).
+        Döner: çerçevenin sıra numarası; korunan slot ezilecekse None (çerçeve düşer).
+        """
+        length = len(data)
+        if length > self.slot_size:
+            raise ValueError(f"Çerçeve slot boyundan büyük ({length} > {self.slot_size})")
+        seq = self.write_seq + 1
+        if self.pinned is not None and seq - self.pinned >= self.slots:
+            self.overruns += 1
+            return None
+        off = self._slot_offset(seq)
+        # Önce sırayı geçersiz kıl, veriyi yaz, sonra sırayı yayınla
+        SLOT_HEADER.pack_into(self.buf, off, 0, t_ns, length)
+        start = off + SLOT_HEADER.size
+        self.buf[start:start + length] = data
+        SLOT_HEADER.pack_into(self.buf, off, seq, t_ns, length)
+        struct.pack_into("<Q", self.buf, 0, seq)
+        return seq
+
+    def view(self, seq: int):
+        """
+        `seq` çerçevesinin verisine kopyasız memoryview döner; slot ezildiyse None.
+        View yalnızca slot yeniden yazılana kadar geçerlidir (bkz. valid()).
+        """
+        off = self._slot_offset(seq)
+        slot_seq, _, length = SLOT_HEADER.unpack_from(self.buf, off)
+        if slot_seq != seq:
+            return None
+        start = off + SLOT_HEADER.size
+        return self.buf[start:start + length]
+
+    def valid(self, seq: int) -> bool:
+        """`seq` çerçevesi hâlâ slotunda mı?"""
+        return SLOT_HEADER.unpack_from(self.buf, self._slot_offset(seq))[0] == seq
+
+    def reader(self, from_start=False):
+        """Bu halka için bağımsız imleçli okuyucu. Varsayılan: yalnızca yeni çerçeveler."""
+        return RingReader(self, 1 if from_start else self.write_seq + 1)
+
+    def close(self):
+        self.buf.release()
+        if self._shm is not None:
+            self._shm.close()
+
+    def unlink(self):
+        if self._shm is not None:
+            self._shm.unlink()
+
+
+class RingReader:
+    """Tek okuyucunun imleci. Yazar okuyucuyu beklemez; geride kalınırsa kayıp sayılır."""
+
+    def __init__(self, ring: FrameRing, next_seq: int):
+        self.ring = ring
+        self.next_seq = next_seq
+        self.lost = 0
+
+    def pending(self) -> int:
+        return self.ring.write_seq - self.next_seq + 1
+
+    def _span(self, max_frames):
+        ring = self.ring
+        head = ring.write_seq
+        if head - self.next_seq + 1 > ring.slots:
+            oldest = head - ring.slots + 1
+            self.lost += oldest - self.next_seq
+            self.next_seq = oldest
+        last = head if max_frames is None else min(head, self.next_seq + max_frames - 1)
+        return range(self.next_seq, last + 1)
+
+    def read_views(self, max_frames=None):
+        """
+        Yeni çerçeveleri kopyalamadan döner: [(sıra, t_ns, memoryview), ...].
+        View'lar halka dolanana kadar geçerlidir; uzun tutulacaksa ring.valid(sıra)
+        ile kontrol edilmeli veya bytes() ile kopyalanmalıdır.
+        """
+        ring = self.ring
+        frames = []
+        span = self._span(max_frames)
+        for seq in span:
+            off = ring._slot_offset(seq)
+            slot_seq, t_ns, length = SLOT_HEADER.unpack_from(ring.buf, off)
+            if slot_seq != seq:
+                self.lost += 1
+                continue
+            start = off + SLOT_HEADER.size
+            frames.append((seq, t_ns, ring.buf[start:start + length]))
+        self.next_seq = span.stop
+        return frames
+
+    def read(self, max_frames=None):
+        """
+        Yeni çerçeveleri kopyalayarak döner: [(sıra, t_ns, bytes), ...].
+        Okunamadan üzerine yazılan çerçeveler self.lost'a eklenir.
+        """
+        ring = self.ring
+        span = self._span(max_frames)
+        frames = []
+        buf = ring.buf
+        for seq in span:
+            off = ring._slot_offset(seq)
+            slot_seq, t_ns, length = SLOT_HEADER.unpack_from(buf, off)
+            start = off + SLOT_HEADER.size
+            data = bytes(buf[start:start + length])
+            if slot_seq != seq or SLOT_HEADER.unpack_from(buf, off)[0] != seq:
+                self.lost += 1
+                continue
+            frames.append((seq, t_ns, data))
+        self.next_seq = span.stop
+        return frames
@@ -0,0 +1,151 @@
+# ble_scheduler.py
+# Tek BLE bağlantısı (Wizepod oturumu) önünde öncelikli komut kuyruğu.
+# Sürekli okuma gibi arka plan trafiği hat doluyken bile kullanıcı
+# komutlarının (OKU/YAZ) kısa sürede sıraya girmesini sağlar.
+# Kuyruk oturumun sahibine aittir: ble_daemon her bağlantı için bir tane tutar ve
+# servise gelen send/call isteklerini buradan geçirir.
+import asyncio
+import collections
+
+INTERACTIVE  = 0   # operatör tıklamaları (OKU / YAZ)
+PROVISIONING = 1   # eşik, AFE, versiyon yazma gibi toplu ayarlar
+BACKGROUND   = 2   # sürekli okuma / periyodik sorgular
+
+# Ağırlıklı round-robin: hat doluyken her turda sınıf başına gönderilecek komut sayısı.
+# Arka plan trafiği hiçbir zaman tamamen aç kalmaz.
+DEFAULT_WEIGHTS = {INTERACTIVE: 4, PROVISIONING: 2, BACKGROUND: 1}
+
+
+class _Request:
+    __slots__ = ("cmd", "priority", "key", "timeout", "future")
+
+    def __init__(self, cmd, priority, key, timeout, future):
+        self.cmd = cmd
+        self.priority = priority
+        self.key = key
+        self.timeout = timeout
+        self.future = future
+
+
+class LinkScheduler:
+    """
+    Bir oturuma giden komutları öncelik sınıflarına göre sıralar.
+
+    - Aynı `key` ile gönderilen ve henüz başlamamış eski istek iptal edilir
+      (ör. art arda gelen "eşikleri yaz" isteklerinde yalnızca sonuncusu gider).
+    - Sınıflar arasında ağırlıklı round-robin uygulanır.
+    """
+
+    def __init__(self, session, weights=None):
+        self.session = session
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self._queues = {p: collections.deque() for p in self.weights}
+        self._budget = dict(self.weights)
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._worker = None
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for queue in self._queues.values():
+            while queue:
+                queue.popleft().future.cancel()
+        self._pending.clear()
+
+    def submit(self, cmd, priority=INTERACTIVE, key=None, timeout=5.0) -> asyncio.Future:
+        """
+        Komutu kuyruğa ekler. Döner: cevap baytlarıyla tamamlanacak Future.
+        """
+        return self._enqueue(list(cmd), priority, key, timeout)
+
+    def submit_call(self, factory, priority=INTERACTIVE, key=None) -> asyncio.Future:
+        """
+        Komut yerine `factory()` eşyordamını kuyruğa ekler (ör. ble_core.read_* çağrısı).
+        Çağrı sırası gelince işçide çalışır; böylece send() ile aynı hatta sıralanır.
+        Döner: eşyordamın sonucuyla tamamlanacak Future.
+        """
+        return self._enqueue(factory, priority, key, None)
+
+    def _enqueue(self, cmd, priority, key, timeout):
+        if priority not in self._queues:
+            raise ValueError(f"Bilinmeyen öncelik sınıfı: {priority}")
+        future = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self.cancel(key)
+        req = _Request(cmd, priority, key, timeout, future)
+        self._queues[priority].append(req)
+        if key is not None:
+            self._pending[key] = req
+        self._wakeup.set()
+        self.start()
+        return future
+
+    async def send(self, cmd, priority=INTERACTIVE, key=None, timeout=5.0) -> bytes:
+        return await self.submit(cmd, priority, key, timeout)
+
+    async def call(self, factory, priority=INTERACTIVE, key=None):
+        return await self.submit_call(factory, priority, key)
+
+    def cancel(self, key) -> bool:
+        """Henüz başlamamış, `key` ile eşleşen isteği iptal eder."""
+        req = self._pending.pop(key, None)
+        if req is None:
+            return False
+        try:
+            self._queues[req.priority].remove(req)
+        except ValueError:
+            return False
+        req.future.cancel()
+        return True
+
+    def pending(self) -> dict:
+        """Sınıf başına bekleyen istek sayısı."""
+        return {p: len(q) for p, q in self._queues.items()}
+
+    def _next(self):
+        # Önce bütçesi kalan en yüksek öncelikli dolu kuyruk
+        for priority in sorted(self._queues):
+            if self._queues[priority] and self._budget[priority] > 0:
+                self._budget[priority] -= 1
+                return self._queues[priority].popleft()
+        # Tüm dolu kuyrukların bütçesi bitti → yeni tur
+        if any(self._queues.values()):
+            self._budget = dict(self.weights)
+            return self._next()
+        return None
+
+    async def _run(self):
+        while True:
+            req = self._next()
+            if req is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if req.key is not None and self._pending.get(req.key) is req:
+                del self._pending[req.key]
+            if req.future.done():
+                continue
+            try:
+                if callable(req.cmd):
+                    result = await req.cmd()
+                else:
+                    result = await self.session.send(req.cmd, timeout=req.timeout)
+            except asyncio.CancelledError:
+                req.future.cancel()
+                raise
+            except Exception as e:
+                if not req.future.done():
+                    req.future.set_exception(e)
+            else:
+                if not req.future.done():
+                    req.future.set_result(result)
@@ -0,0 +1,107 @@
+# ble_trace.py
+# Bildirimden UI çizimine kadar uçtan uca gecikme ölçümü.
+#
+# Her çerçeve geldiği anda (notify/read callback'inde) monoton saatle
+# (perf_counter_ns) damgalanır; bu damga halka, çözümleme, kayıt, kuyruk,
+# Qt sinyali ve çizim aşamalarından taşınır. Aşama damgaları arasındaki farklar
+# aşama başına istatistik olarak toplanır. Duvar saati gerektiğinde (CSV, tsdb)
+# ClockAnchor ile dönüştürülür. Linux/Windows'ta monoton saat süreçler arasında
+# ortaktır, bu yüzden farklı süreçlerde alınan damgalar doğrudan karşılaştırılabilir.
+import collections
+import time
+
+
+def now_ns() -> int:
+    return time.perf_counter_ns()
+
+
+class ClockAnchor:
+    """Monoton saat ile duvar saatini eşleyen tek bir (duvar, monoton) çifti."""
+
+    def __init__(self, wall_ns=None, mono_ns=None):
+        if wall_ns is None:
+            mono_ns = now_ns()
+            wall_ns = time.time_ns()
+        self.wall_ns = wall_ns
+        self.mono_ns = mono_ns
+
+    def to_wall_ns(self, mono_ns: int) -> int:
+        return self.wall_ns + (mono_ns - self.mono_ns)
+
+    def to_wall_s(self, mono_ns: int) -> float:
+        return self.to_wall_ns(mono_ns) / 1e9
+
+    def as_tuple(self):
+        """Süreçler arası aktarım için."""
+        return self.wall_ns, self.mono_ns
+
+
+class StageStats:
+    """Bir aşamanın gecikme istatistikleri (son `window` örnek üzerinden yüzdelikler)."""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self._recent = collections.deque(maxlen=window)
+
+    def add(self, ns: int):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self._recent.append(ns)
+
+    def summary(self) -> dict:
+        recent = sorted(self._recent)
+
+        def pct(p):
+            return recent[min(len(recent) - 1, int(p * len(recent)))] / 1e6 if recent else 0.0
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class LatencyTracer:
+    """
+    Aşama damgalarından gecikme dökümü çıkarır.
+
+    record(geliş, [("decode", t1), ("store", t2)]) çağrısı şunları ekler:
+      decode = t1 - geliş, store = t2 - t1, total = t2 - geliş
+    """
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.stages = collections.OrderedDict()
+
+    def _stage(self, name) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(self.window)
+        return stats
+
+    def record(self, arrival_ns: int, stamps):
+        prev = arrival_ns
+        for name, t in stamps:
+            self._stage(name).add(t - prev)
+            prev = t
+        self._stage("total").add(prev - arrival_ns)
+
+    def report(self) -> dict:
+        """{aşama: {"count", "mean_ms", "p50_ms", "p99_ms", "max_ms"}}"""
+        return {name: stats.summary() for name, stats in self.stages.items()}
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{'aşama':<10} {'adet':>7} {'ort ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for name, s in report.items():
+        lines.append(
+            f"{name:<10} {s['count']:>7} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} "
+            f"{s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,408 @@
+# ble_tsdb.py
+# Uzun süreli glikoz/sıcaklık kayıtları için sıkıştırılmış zaman serisi deposu.
+#
+# Her seri (cihaz + kanal) tek bir dosyadır; dosya art arda eklenmiş,
+# kapatılmış (sealed) chunk'lardan oluşur. Bir chunk sabit bir zaman penceresini
+# (varsayılan 1 saat) kapsar ve iki sütun halinde kodlanır (Gorilla yöntemi):
+#   - zaman damgaları (ms): delta-of-delta, değişken uzunluklu önekler
+#   - değerler (float64): bir önceki değerle XOR, yalnızca anlamlı bitler
+# Chunk başlığı: [b"WZC1", t_başlangıç(q), t_bitiş(q), adet(I), bayt(I)]
+#
+# Açık (henüz kapatılmamış) chunk, kayıt sürerken `flush_interval` saniyede bir
+# <dosya>.tail dosyasına aynı biçimde atomik olarak yeniden yazılır. Pencere
+# bitince chunk ana dosyaya eklenir ve tail silinir; böylece her pencere diskte
+# tek chunk olarak kalır. Süreç beklenmedik şekilde sonlanırsa yeniden açılışta
+# açık chunk tail'den geri yüklenir ve kayda oradan devam edilir.
+import math
+import os
+import struct
+import time
+
+from ble_index import IndexEntry, TimeIndex, index_path
+
+CHUNK_MAGIC = b"WZC1"
+CHUNK_HEADER = struct.Struct("<4sqqII")
+DEFAULT_WINDOW_MS = 3600 * 1000
+# Açık chunk'a eklenen örnekler en fazla bu kadar süre (sn) yalnızca bellekte
+# kalır; süreç beklenmedik şekilde sonlanırsa kaybedilen veri bununla sınırlıdır.
+DEFAULT_FLUSH_INTERVAL = 60.0
+TAIL_SUFFIX = ".tail"
+
+_F64 = struct.Struct(">d")
+
+
+def _f2i(value: float) -> int:
+    return int.from_bytes(_F64.pack(value), "big")
+
+
+def _i2f(bits: int) -> float:
+    return _F64.unpack(bits.to_bytes(8, "big"))[0]
+
+
+class BitWriter:
+    def __init__(self):
+        self.buf = bytearray()
+        self.bits = 0
+        self._acc = 0
+        self._n = 0
+
+    def write(self, value: int, nbits: int):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._n += nbits
+        self.bits += nbits
+        while self._n >= 8:
+            self._n -= 8
+            self.buf.append((self._acc >> self._n) & 0xFF)
+        self._acc &= (1 << self._n) - 1
+
+    def getvalue(self) -> bytes:
+        if self._n:
+            return bytes(self.buf) + bytes([(self._acc << (8 - self._n)) & 0xFF])
+        return bytes(self.buf)
+
+
+class BitReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self._acc = 0
+        self._n = 0
+
+    def read(self, nbits: int) -> int:
+        while self._n < nbits:
+            byte = self.data[self.pos] if self.pos < len(self.data) else 0
+            self._acc = (self._acc << 8) | byte
+            self.pos += 1
+            self._n += 8
+        self._n -= nbits
+        value = self._acc >> self._n
+        self._acc &= (1 << self._n) - 1
+        return value
+
+
+# (önek, önek_bit, değer_bit, alt_sınır) — delta-of-delta kovaları
+_DOD_BUCKETS = (
+    (0b10, 2, 7, -63),
+    (0b110, 3, 9, -255),
+    (0b1110, 4, 12, -2047),
+)
+
+
+class ChunkEncoder:
+    """Tek bir zaman penceresinin sütunlarını artımlı olarak kodlar."""
+
+    def __init__(self):
+        self.ts = BitWriter()
+        self.vs = BitWriter()
+        self.count = 0
+        self.t_start = None
+        self.t_end = None
+        self._delta = 0
+        self._value = 0
+        self._lead = None
+        self._trail = None
+        # İndeks özetleri için
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+    def append(self, t: int, value: float):
+        bits = _f2i(value)
+        if value == value:  # NaN özetlere katılmaz
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+            self.sum += value
+        if self.count == 0:
+            self.ts.write(t, 64)
+            self.vs.write(bits, 64)
+            self.t_start = t
+        else:
+            self._write_time(t)
+            self._write_value(bits)
+        self.t_end = t
+        self._value = bits
+        self.count += 1
+
+    def _write_time(self, t: int):
+        delta = t - self.t_end
+        dod = delta - self._delta
+        self._delta = delta
+        if dod == 0:
+            self.ts.write(0, 1)
+            return
+        for prefix, plen, vlen, low in _DOD_BUCKETS:
+            if low <= dod <= low + (1 << vlen) - 1:
+                self.ts.write(prefix, plen)
+                self.ts.write(dod - low, vlen)
+                return
+        self.ts.write(0b1111, 4)
+        self.ts.write(dod, 64)
+
+    def _write_value(self, bits: int):
+        xor = bits ^ self._value
+        if xor == 0:
+            self.vs.write(0, 1)
+            return
+        lead = min(64 - xor.bit_length(), 31)
+        trail = (xor & -xor).bit_length() - 1
+        if self._lead is not None and lead >= self._lead and trail >= self._trail:
+            # Önceki anlamlı bit penceresine sığıyor
+            self.vs.write(0b10, 2)
+            self.vs.write(xor >> self._trail, 64 - self._lead - self._trail)
+            return
+        sig = 64 - lead - trail
+        self.vs.write(0b11, 2)
+        self.vs.write(lead, 5)
+        self.vs.write(sig - 1, 6)
+        self.vs.write(xor >> trail, sig)
+        self._lead, self._trail = lead, trail
+
+    def summary(self):
+        """Döner: (min, max, ortalama)"""
+        if self.min > self.max:
+            return math.nan, math.nan, math.nan
+        return self.min, self.max, self.sum / self.count
+
+    def seal(self) -> bytes:
+        """Chunk'ı başlık + zaman sütunu + değer sütunu olarak döner."""
+        ts, vs = self.ts.getvalue(), self.vs.getvalue()
+        body = struct.pack("<I", len(ts)) + ts + vs
+        header = CHUNK_HEADER.pack(CHUNK_MAGIC, self.t_start, self.t_end, self.count, len(body))
+        return header + body
+
+
+def tail_path(path) -> str:
+    return path + TAIL_SUFFIX
+
+
+def decode_chunk(body: bytes, count: int):
+    """Chunk gövdesini çözer. Döner: (zamanlar, değerler) listeleri."""
+    ts_len = struct.unpack_from("<I", body)[0]
+    tr = BitReader(body[4:4 + ts_len])
+    vr = BitReader(body[4 + ts_len:])
+    times, values = [], []
+    if count == 0:
+        return times, values
+
+    t = tr.read(64)
+    if t >= 1 << 63:
+        t -= 1 << 64
+    bits = vr.read(64)
+    times.append(t)
+    values.append(_i2f(bits))
+    delta, lead, trail = 0, 0, 0
+    for _ in range(count - 1):
+        # Zaman
+        if tr.read(1) == 0:
+            dod = 0
+        elif tr.read(1) == 0:
+            dod = tr.read(7) - 63
+        elif tr.read(1) == 0:
+            dod = tr.read(9) - 255
+        elif tr.read(1) == 0:
+            dod = tr.read(12) - 2047
+        else:
+            dod = tr.read(64)
+            if dod >= 1 << 63:
+                dod -= 1 << 64
+        delta += dod
+        t += delta
+        times.append(t)
+        # Değer
+        if vr.read(1) == 1:
+            if vr.read(1) == 1:
+                lead = vr.read(5)
+                sig = vr.read(6) + 1
+                trail = 64 - lead - sig
+            bits ^= vr.read(64 - lead - trail) << trail
+        values.append(_i2f(bits))
+    return times, values
+
+
+class SeriesStore:
+    """
+    Tek bir zaman serisi dosyası.
+
+    append() canlı akıştan gelen örnekleri açık chunk'a ekler; örnek yeni bir
+    zaman penceresine düştüğünde açık chunk kapatılıp dosyanın sonuna yazılır.
+    Açık chunk ayrıca `flush_interval` saniyede bir (append veya flush_if_due
+    sırasında) tail dosyasına yazılır; kapatılmaz.
+    Her kapatılan chunk <dosya>.idx yan indeksine de eklenir (bkz. ble_index).
+    Dosya yeniden açıldığında son zaman damgası ve açık chunk geri yüklenir.
+    """
+
+    def __init__(self, path, window_ms=DEFAULT_WINDOW_MS, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.window_ms = window_ms
+        self.flush_interval = flush_interval
+        self._open = None
+        self._dirty = False
+        self._persisted_at = time.monotonic()
+        self._last_t = None
+        self._index = None
+        self._restore()
+
+    def _restore(self):
+        """Son kapatılmış chunk'tan _last_t'yi, tail dosyasından açık chunk'ı geri yükler."""
+        last = None
+        for last in self.chunks():
+            pass
+        if last is not None:
+            self._last_t = last[2]
+        tail = tail_path(self.path)
+        if not os.path.isfile(tail):
+            return
+        with open(tail, "rb") as f:
+            data = f.read()
+        if len(data) < CHUNK_HEADER.size:
+            return
+        magic, t0, t1, count, nbytes = CHUNK_HEADER.unpack_from(data)
+        if magic != CHUNK_MAGIC or len(data) < CHUNK_HEADER.size + nbytes:
+            print(f"Bozuk tail dosyası yok sayıldı: {tail}")
+            return
+        if last is not None and last[1] == t0:
+            # Chunk kapatılıp eklendikten sonra tail silinemeden kesilmiş
+            os.remove(tail)
+            return
+        times, values = decode_chunk(data[CHUNK_HEADER.size:CHUNK_HEADER.size + nbytes], count)
+        self._open = ChunkEncoder()
+        for t, v in zip(times, values):
+            self._open.append(t, v)
+        self._last_t = t1
+
+    @property
+    def index(self) -> TimeIndex:
+        """Yan indeks; eksik veya dosyayla uyumsuzsa chunk başlıklarından yeniden kurulur."""
+        if self._index is None:
+            self._index = TimeIndex(index_path(self.path))
+        size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        if self._index.covered != size:
+            self._rebuild_index()
+        return self._index
+
+    def _rebuild_index(self):
+        self._index.reset()
+        with open(self.path, "rb") as f:
+            for offset, t0, t1, count, nbytes in self.chunks():
+                f.seek(offset + CHUNK_HEADER.size)
+                _, values = decode_chunk(f.read(nbytes), count)
+                finite = [v for v in values if v == v]
+                if finite:
+                    lo, hi, mean = min(finite), max(finite), sum(finite) / len(finite)
+                else:
+                    lo = hi = mean = math.nan
+                self._index.add(IndexEntry(offset, t0, t1, count, lo, hi, mean),
+                                offset + CHUNK_HEADER.size + nbytes)
+
+    def append(self, t_ms: int, value: float):
+        t_ms = int(t_ms)
+        if self._last_t is not None and t_ms < self._last_t:
+            raise ValueError(f"Zaman damgası geriye gidiyor ({t_ms} < {self._last_t})")
+        if self._open is not None and t_ms // self.window_ms != self._open.t_start // self.window_ms:
+            self.flush()
+        if self._open is None:
+            self._open = ChunkEncoder()
+        self._open.append(t_ms, float(value))
+        self._last_t = t_ms
+        self._dirty = True
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        """Son tail yazımından bu yana flush_interval geçtiyse yeni örnekleri tail'e yazar."""
+        if self._dirty and self.flush_interval is not None and \
+                time.monotonic() - self._persisted_at >= self.flush_interval:
+            self.persist()
+
+    def persist(self):
+        """Açık chunk'ı kapatmadan tail dosyasına atomik olarak yazar."""
+        if self._open is None or self._open.count == 0:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tail = tail_path(self.path)
+        with open(tail + ".tmp", "wb") as f:
+            f.write(self._open.seal())
+        os.replace(tail + ".tmp", tail)
+        self._dirty = False
+        self._persisted_at = time.monotonic()
+
+    def flush(self):
+        """Açık chunk'ı kapatıp diske yazar."""
+        if self._open is None or self._open.count == 0:
+            return
+        index = self.index
+        data = self._open.seal()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        lo, hi, mean = self._open.summary()
+        index.add(
+            IndexEntry(offset, self._open.t_start, self._open.t_end, self._open.count, lo, hi, mean),
+            offset + len(data),
+        )
+        self._open = None
+        self._dirty = False
+        if os.path.isfile(tail_path(self.path)):
+            os.remove(tail_path(self.path))
+
+    close = flush
+
+    def chunks(self):
+        """Dosyadaki chunk başlıklarını gezer: (ofset, t_başlangıç, t_bitiş, adet, bayt)."""
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "rb") as f:
+            offset = 0
+            while True:
+                header = f.read(CHUNK_HEADER.size)
+                if len(header) < CHUNK_HEADER.size:
+                    return
+                magic, t0, t1, count, nbytes = CHUNK_HEADER.unpack(header)
+                if magic != CHUNK_MAGIC:
+                    raise ValueError(f"Bozuk chunk başlığı ({self.path}, ofset {offset})")
+                yield offset, t0, t1, count, nbytes
+                f.seek(nbytes, os.SEEK_CUR)
+                offset += CHUNK_HEADER.size + nbytes
+
+    def read(self, start_ms=None, end_ms=None):
+        """
+        [start_ms, end_ms] aralığındaki örnekleri döner: (zamanlar, değerler).
+        Aralık dışındaki chunk'lar çözülmeden atlanır.
+        """
+        times, values = [], []
+        selected = self.index.locate(start_ms, end_ms)
+        if selected:
+            with open(self.path, "rb") as f:
+                for e in selected:
+                    f.seek(e.offset)
+                    header = f.read(CHUNK_HEADER.size)
+                    nbytes = CHUNK_HEADER.unpack(header)[4]
+                    ts, vs = decode_chunk(f.read(nbytes), e.count)
+                    times.extend(ts)
+                    values.extend(vs)
+        if self._open is not None and self._open.count:
+            ts, vs = decode_chunk(self._open.seal()[CHUNK_HEADER.size:], self._open.count)
+            times.extend(ts)
+            values.extend(vs)
+        if start_ms is not None or end_ms is not None:
+            lo = float("-inf") if start_ms is None else start_ms
+            hi = float("inf") if end_ms is None else end_ms
+            pairs = [(t, v) for t, v in zip(times, values) if lo <= t <= hi]
+            times = [p[0] for p in pairs]
+            values = [p[1] for p in pairs]
+        return times, values
+
+    def summaries(self, start_ms=None, end_ms=None, max_points=None):
+        """Kapatılmış chunk'ların min/max/ortalama özetleri (ham veri çözülmez)."""
+        return self.index.summaries(start_ms, end_ms, max_points)
+
+    def read_numpy(self, start_ms=None, end_ms=None):
+        """read() ile aynı, NumPy dizileri olarak: (int64 zamanlar, float64 değerler)."""
+        import numpy as np
+        times, values = self.read(start_ms, end_ms)
+        return np.fromiter(times, dtype=np.int64, count=len(times)), \
+            np.fromiter(values, dtype=np.float64, count=len(values))
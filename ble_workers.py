@@ -0,0 +1,375 @@
+# ble_workers.py
+# Çok süreçli veri hattı:
+#
+#   [BLE süreci] ──ham çerçeve + t_ns──▶ [paylaşımlı halka] ──▶ [kayıt süreci]  (çözümle, CSV, tsdb)
+#                                                          └─▶ [analiz süreci] (çözümle, özet) ──▶ GUI
+#
+# BLE süreci yalnızca okur, zaman damgası basar ve halkaya yazar; disk gecikmesi,
+# GIL ya da ağır analiz veri toplama zamanlamasını etkilemez. Her işçi halkayı
+# kendi imleciyle okur, GUI yalnızca analiz sürecinin kuyruğa koyduğu özetleri alır.
+#
+# socket_path verilirse BLE süreci cihaza kendisi bağlanmaz; okumaları ble_daemon
+# servisinin kalıcı bağlantısından arka plan önceliğiyle yapar. Böylece OKU/YAZ
+# komutları cihaza erişebilir ve sürekli okumanın arkasında beklemez.
+#
+# Halkadaki t_ns, çerçevenin geldiği andaki monoton saattir (ble_trace.now_ns).
+# İşçiler aşama gecikmelerini `traces` kuyruğuna raporlar; duvar saati
+# Pipeline'ın oluşturduğu ClockAnchor ile hesaplanır.
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import queue
+import time
+
+from ble_ring import FrameRing
+from ble_trace import ClockAnchor, LatencyTracer, now_ns
+
+CSV_FILE = "bluetooth_data.csv"
+RECORD_DIR = "recordings"
+
+_POLL_INTERVAL = 0.005
+_TRACE_INTERVAL = 1.0
+
+
+def decode_frame(data: bytes) -> str:
+    return data.decode(errors="ignore")
+
+
+def _report_error(out_queue, message):
+    """Hata özetini GUI kuyruğuna koyar: {"error": "Hata: ...", "t_ns": ...}"""
+    if out_queue is None:
+        return
+    try:
+        out_queue.put_nowait({"error": "Hata: " + message, "t_ns": now_ns()})
+    except queue.Full:
+        pass
+
+
+def _wait_frames(reader, stop_event, max_frames=None, timeout=None):
+    """Yeni çerçeve gelene, durdurulana veya `timeout` dolana kadar kısa aralıklarla bekler."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not stop_event.is_set():
+        frames = reader.read(max_frames)
+        if frames or (deadline is not None and time.monotonic() >= deadline):
+            return frames
+        time.sleep(_POLL_INTERVAL)
+    return reader.read(max_frames)
+
+
+# ---------- BLE süreci ----------
+
+@contextlib.asynccontextmanager
+async def _open_reader(mac_address, char_uuid, socket_path):
+    """(okuma_fonksiyonu, bağlı_mı) verir: servis üzerinden ya da doğrudan BleakClient ile."""
+    if socket_path:
+        from ble_daemon import DaemonClient
+        async with DaemonClient(socket_path) as service:
+            await service.connect_device(mac_address)
+            yield (lambda: service.read(mac_address, char_uuid)), (lambda: service.connected)
+        return
+    from bleak import BleakClient
+    async with BleakClient(mac_address) as client:
+        if not client.is_connected:
+            raise ConnectionError("Cihaza bağlanılamadı.")
+        yield (lambda: client.read_gatt_char(char_uuid)), (lambda: client.is_connected)
+
+
+async def _acquire(mac_address, char_uuid, ring, stop_event, period, capture, out_queue,
+                   socket_path=None):
+    while not stop_event.is_set():
+        try:
+            async with _open_reader(mac_address, char_uuid, socket_path) as (read, connected):
+                while not stop_event.is_set() and connected():
+                    # Tek okuma hatası süreci bitirmez; GUI'ye bildirilir ve okumaya devam edilir
+                    try:
+                        data = await read()
+                        t_arrival = now_ns()
+                        ring.push(data, t_arrival)
+                        if capture is not None:
+                            capture.rx(data, t_arrival)
+                    except Exception as e:
+                        _report_error(out_queue, str(e))
+                    await asyncio.sleep(period)
+        except Exception as e:
+            # Bağlantı kurulamadı veya koptu → bildir, biraz bekleyip yeniden bağlan
+            _report_error(out_queue, str(e))
+            await asyncio.sleep(max(period, 1.0))
+
+
+def acquisition_main(mac_address, char_uuid, ring_name, stop_event, period=1.0, capture_path=None,
+                     out_queue=None, socket_path=None):
+    ring = FrameRing.attach(ring_name)
+    capture = None
+    if capture_path:
+        from ble_capture import CaptureWriter
+        capture = CaptureWriter(capture_path)
+    try:
+        asyncio.run(_acquire(mac_address, char_uuid, ring, stop_event, period, capture, out_queue,
+                             socket_path))
+    except Exception as e:
+        print("BLE okuma süreci hatası:", e)
+        _report_error(out_queue, str(e))
+    finally:
+        if capture is not None:
+            capture.close()
+        ring.close()
+
+
+# ---------- Kayıt süreci ----------
+
+class _TraceReporter:
+    """İşçinin gecikme dökümünü belirli aralıklarla kuyruğa koyar."""
+
+    def __init__(self, worker, out_queue):
+        self.worker = worker
+        self.out_queue = out_queue
+        self.tracer = LatencyTracer()
+        self._next = time.monotonic() + _TRACE_INTERVAL
+
+    def maybe_report(self, force=False):
+        if self.out_queue is None or not (force or time.monotonic() >= self._next):
+            return
+        self._next = time.monotonic() + _TRACE_INTERVAL
+        try:
+            self.out_queue.put_nowait((self.worker, self.tracer.report()))
+        except queue.Full:
+            pass
+
+
+def storage_main(mac_address, char_uuid, ring_name, stop_event, anchor,
+                 trace_queue=None, heartbeat=60.0, deadband=0.0):
+    import csv
+    from ble_index import CsvIndex
+    from ble_ingest import ChangeDetector
+    from ble_tsdb import SeriesStore
+
+    anchor = ClockAnchor(*anchor)
+    trace = _TraceReporter("storage", trace_queue)
+    ring = FrameRing.attach(ring_name)
+    reader = ring.reader(from_start=True)
+    ingest = ChangeDetector(default_deadband=deadband, heartbeat=heartbeat)
+    series = f"{mac_address.replace(':', '')}_{char_uuid.split('-')[0]}.wzts"
+    store = SeriesStore(os.path.join(RECORD_DIR, series))
+
+    def record(t_s, value, writer):
+        writer.writerow([t_s, value])
+        try:
+            store.append(t_s * 1000, float(value))
+        except ValueError:
+            pass  # sayısal olmayan veri yalnızca CSV'ye gider
+
+    try:
+        while not stop_event.is_set() or reader.pending() > 0:
+            frames = _wait_frames(reader, stop_event, timeout=1.0)
+            # Veri seyrekken de açık chunk zamanında diske yazılsın
+            store.flush_if_due()
+            if not frames:
+                continue
+            t_dequeue = now_ns()
+            decoded = []
+            file_exists = os.path.isfile(CSV_FILE)
+            with open(CSV_FILE, mode="a", newline="") as file:
+                writer = csv.writer(file)
+                if not file_exists:
+                    writer.writerow(["Zaman", "Veri"])
+                for seq, t_ns, data in frames:
+                    value = decode_frame(data)
+                    decoded.append((t_ns, now_ns()))
+                    t_s = anchor.to_wall_s(t_ns)
+                    if ingest.feed(char_uuid, t_s, value) is not None:
+                        record(t_s, value, writer)
+            t_stored = now_ns()
+            for t_ns, t_decoded in decoded:
+                trace.tracer.record(t_ns, [("ring", t_dequeue), ("decode", t_decoded),
+                                           ("store", t_stored)])
+            trace.maybe_report()
+        event = ingest.flush(char_uuid)
+        if event is not None:
+            with open(CSV_FILE, mode="a", newline="") as file:
+                record(event.t, event.value, csv.writer(file))
+    finally:
+        store.close()
+        CsvIndex(CSV_FILE).refresh()
+        trace.maybe_report(force=True)
+        if reader.lost:
+            print(f"Kayıt süreci {reader.lost} çerçeve kaçırdı.")
+        ring.close()
+
+
+# ---------- Analiz süreci ----------
+
+def stats_main(ring_name, stop_event, out_queue, interval=0.25, trace_queue=None,
+               anchor=None, alert_rules=None, alert_window=60.0, channel=None,
+               heartbeat=60.0, deadband=0.0):
+    """
+    Çerçeveleri çözümler ve `interval` saniyede bir GUI'ye özet gönderir:
+    {"last": son geçen değer, "t_ns": o çerçevenin geliş damgası, "kind": CHANGE/HEARTBEAT,
+     "t_queued": kuyruğa konma damgası, "frames": adet, "min"/"max"/"mean", "lost": kayıp,
+     "alerts": [ble_alerts.Alert, ...]}
+    Kayıt süreciyle aynı değişim algılama uygulanır: özet yalnızca aralıkta bir geçiş
+    ya da heartbeat varsa (veya alarm üretildiyse) gönderilir; UI örnek hızında güncellenmez.
+    alert_rules verilirse her örnek eşiklere göre değerlendirilir; alarm üreten
+    örnekten sonra özet aralık dolmadan hemen gönderilir.
+    """
+    from ble_ingest import ChangeDetector
+
+    engine = None
+    if alert_rules:
+        from ble_alerts import AlertEngine
+        engine = AlertEngine(alert_rules, alert_window)
+    ingest = ChangeDetector(default_deadband=deadband, heartbeat=heartbeat)
+    anchor = ClockAnchor(*anchor) if anchor else ClockAnchor()
+    trace = _TraceReporter("stats", trace_queue)
+    ring = FrameRing.attach(ring_name)
+    reader = ring.reader(from_start=True)
+    try:
+        while not stop_event.is_set():
+            deadline = time.monotonic() + interval
+            frames, numbers, alerts = [], [], []
+            passed = None
+            while time.monotonic() < deadline and not stop_event.is_set() and not alerts:
+                new = reader.read()
+                if not new:
+                    time.sleep(_POLL_INTERVAL)
+                    continue
+                t_dequeue = now_ns()
+                for seq, t_ns, data in new:
+                    value = decode_frame(data)
+                    try:
+                        numbers.append(float(value))
+                    except ValueError:
+                        pass
+                    t_s = anchor.to_wall_s(t_ns)
+                    event = ingest.feed(channel, t_s, value)
+                    if event is not None:
+                        passed = (event, t_ns)
+                    if engine is not None:
+                        alerts.extend(engine.feed(channel, t_s, value))
+                    trace.tracer.record(t_ns, [("ring", t_dequeue), ("decode", now_ns())])
+                frames.extend(new)
+            if passed is None and not alerts:
+                continue  # bastırılan tekrarlar UI'ya gitmez
+            summary = {"frames": len(frames), "lost": reader.lost, "alerts": alerts}
+            if passed is not None:
+                event, t_ns = passed
+                summary.update(last=event.value, t_ns=t_ns, kind=event.kind)
+            if numbers:
+                summary.update(min=min(numbers), max=max(numbers), mean=sum(numbers) / len(numbers))
+            summary["t_queued"] = now_ns()
+            try:
+                out_queue.put_nowait(summary)
+            except queue.Full:
+                pass  # GUI yetişemiyorsa eski özetler birikmesin
+            trace.maybe_report()
+    finally:
+        trace.maybe_report(force=True)
+        ring.close()
+
+
+# ---------- GUI tarafı ----------
+
+class Pipeline:
+    """
+    Halka + BLE/kayıt/analiz süreçlerini başlatır.
+    GUI poll() ile en son özetleri bloklamadan alır.
+
+    :param capture: verilirse BLE süreci ham çerçeveleri bu dosyaya da kaydeder
+    :param replay: verilirse BLE yerine bu kayıt dosyası `speed` hızında oynatılır
+    :param alert_rules: ble_alerts kuralları; alarmlar özetlerin "alerts" alanında gelir
+    :param heartbeat, deadband: kayıt ve GUI yolundaki değişim algılama (ble_ingest) ayarları
+    :param socket_path: verilirse BLE süreci cihazı ble_daemon servisi üzerinden okur
+    """
+
+    def __init__(self, mac_address, char_uuid, period=1.0, slots=4096, slot_size=512,
+                 capture=None, replay=None, speed=1.0, alert_rules=None, alert_window=60.0,
+                 heartbeat=60.0, deadband=0.0, socket_path=None):
+        self.mac_address = mac_address
+        self.char_uuid = char_uuid
+        self.period = period
+        self.slots = slots
+        self.slot_size = slot_size
+        self.capture = capture
+        self.replay = replay
+        self.speed = speed
+        self.alert_rules = alert_rules
+        self.alert_window = alert_window
+        self.heartbeat = heartbeat
+        self.deadband = deadband
+        self.socket_path = socket_path
+        # Qt süreçlerinde fork güvenli değil
+        self._ctx = multiprocessing.get_context("spawn")
+        self._ring = None
+        self._stop = None
+        self._procs = []
+        self.results = None
+        self.traces = None
+        self.anchor = None
+        self._latency = {}
+
+    def start(self):
+        self._ring = FrameRing.create(self.slots, self.slot_size)
+        self._stop = self._ctx.Event()
+        self.results = self._ctx.Queue(maxsize=64)
+        self.traces = self._ctx.Queue(maxsize=64)
+        self.anchor = ClockAnchor()
+        name = self._ring.name
+        if self.replay:
+            from ble_capture import replay_main
+            source = self._ctx.Process(target=replay_main, name="wizepod-replay",
+                                       args=(self.replay, name, self._stop, self.speed))
+        else:
+            source = self._ctx.Process(target=acquisition_main, name="wizepod-ble",
+                                       args=(self.mac_address, self.char_uuid, name, self._stop,
+                                             self.period, self.capture, self.results,
+                                             self.socket_path))
+        self._procs = [
+            # Okuyucular BLE sürecinden önce başlar; ilk çerçeveler kaçmaz
+            self._ctx.Process(target=storage_main, name="wizepod-storage",
+                              args=(self.mac_address, self.char_uuid, name, self._stop,
+                                    self.anchor.as_tuple(), self.traces, self.heartbeat,
+                                    self.deadband)),
+            self._ctx.Process(target=stats_main, name="wizepod-stats",
+                              args=(name, self._stop, self.results, 0.25, self.traces,
+                                    self.anchor.as_tuple(), self.alert_rules, self.alert_window,
+                                    (self.mac_address, self.char_uuid), self.heartbeat,
+                                    self.deadband)),
+            source,
+        ]
+        for proc in self._procs:
+            proc.daemon = True
+            proc.start()
+
+    def poll(self):
+        """Birikmiş özetleri döner (bloklamaz)."""
+        out = []
+        while True:
+            try:
+                out.append(self.results.get_nowait())
+            except queue.Empty:
+                return out
+
+    def latency(self) -> dict:
+        """İşçilerin son gecikme dökümleri: {"storage": {...}, "stats": {...}}"""
+        while self.traces is not None:
+            try:
+                worker, report = self.traces.get_nowait()
+            except queue.Empty:
+                break
+            self._latency[worker] = report
+        return dict(self._latency)
+
+    def stop(self, timeout=5.0):
+        if self._stop is None:
+            return
+        self._stop.set()
+        for proc in self._procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+        self._procs = []
+        self.latency()
+        self._ring.close()
+        self._ring.unlink()
+        self._ring = None
+        self._stop = None
@@ -0,0 +1,147 @@
+# check_bulk_credits.py
+# Kredi penceresinin art arda bulk aktarımlarda küçülmediğini sahte bir cihazla doğrular.
+# Cihaz her 0x70 çerçevesi için krediyi hemen (yazma döndükten hemen sonra) iade eder;
+# pencere krediler dönmeden ayrılırsa her aktarımda bir kredi kaybolur ve
+# birkaç aktarım sonra "Cihaz kredi iade etmedi" hatası alınır.
+# Kullanım: python check_bulk_credits.py
+import asyncio
+import os
+import sys
+import tempfile
+
+from ble_bulk import BULK_CREDIT, BULK_DATA, DATA_HEADER, BulkTransfer
+from ble_ota import OTA_ACK, OTA_BLOCK, OTA_END, OTA_START, OtaUpdater
+from wizepod import Wizepod
+
+TRANSFERS = 32
+PAYLOAD = bytes(range(256)) * 8
+WINDOW = 4
+
+
+class ImmediateCreditClient:
+    """Her veri çerçevesine aynı event loop turunda [0x71, 1] ile cevap veren sahte istemci."""
+
+    def __init__(self):
+        self.is_connected = False
+        self.mtu_size = 247
+        self.frames = 0
+        self._callback = None
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    async def start_notify(self, uuid, callback):
+        self._callback = callback
+
+    async def stop_notify(self, uuid):
+        self._callback = None
+
+    def indicate(self, data: bytes):
+        asyncio.get_running_loop().call_soon(self._callback, None, bytearray(data))
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        await asyncio.sleep(0)   # gerçek yazma gibi event loop'a bir tur bırakır
+        if data[0] == BULK_DATA:
+            self.frames += 1
+            self.indicate(bytes([BULK_CREDIT, 1]))
+
+
+class ImmediateCreditOtaClient(ImmediateCreditClient):
+    """OTA komutlarını da cevaplayan sahte cihaz; her blok tamamlanınca 0x82 onayı gönderir."""
+
+    def __init__(self):
+        super().__init__()
+        self.acked = 0
+        self._block = None
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        await asyncio.sleep(0)
+        data = bytes(data)
+        op = data[0]
+        if op == OTA_START:
+            self.indicate(bytes([OTA_START, 0]) + self.acked.to_bytes(4, "little"))
+        elif op == OTA_BLOCK:
+            offset = int.from_bytes(data[1:5], "little")
+            length = int.from_bytes(data[5:7], "little")
+            self._block = [offset, length, 0]
+        elif op == BULK_DATA:
+            self.frames += 1
+            self.indicate(bytes([BULK_CREDIT, 1]))
+            block = self._block
+            block[2] += len(data) - DATA_HEADER
+            if block[2] >= block[1]:
+                self.acked = block[0] + block[1]
+                self.indicate(bytes([OTA_ACK, 0]) + self.acked.to_bytes(4, "little"))
+        elif op == OTA_END:
+            self.indicate(bytes([OTA_END, 0]))
+
+
+async def _session(client_class=ImmediateCreditClient):
+    client = client_class()
+    session = Wizepod("00:00:00:00:00:00", client=client)
+    await session.connect()
+    return client, session
+
+
+async def check_back_to_back() -> int:
+    """Aynı BulkTransfer ile art arda send() (ör. OTA blokları) ve send_bulk() çağrıları."""
+    client, session = await _session()
+    transfer = BulkTransfer(session, window=WINDOW)
+    sent = 0
+    for _ in range(TRANSFERS):
+        sent += await asyncio.wait_for(transfer.send(PAYLOAD), 5.0)
+        sent += await asyncio.wait_for(session.send_bulk(PAYLOAD, window=WINDOW), 5.0)
+        if transfer.credits.outstanding:
+            raise AssertionError(f"aktarım sonrası {transfer.credits.outstanding} kredi dönmedi")
+    if sent != client.frames:
+        raise AssertionError(f"gönderilen {sent} çerçeve, cihaza ulaşan {client.frames}")
+    return sent
+
+
+async def check_attached() -> int:
+    """Pencere bir kez bağlanıp bloklar arasında ayrılmadığında."""
+    client, session = await _session()
+    sent = 0
+    async with BulkTransfer(session, window=WINDOW) as transfer:
+        for _ in range(TRANSFERS):
+            sent += await asyncio.wait_for(transfer.send(PAYLOAD), 5.0)
+    return sent
+
+
+async def check_ota() -> int:
+    """Çok bloklu OTA, kredileri hemen iade eden cihazda yeniden bağlanmadan bitmeli."""
+    client, session = await _session(ImmediateCreditOtaClient)
+    image = os.urandom(64 * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        updater = OtaUpdater(session, block_size=1024, max_retries=0,
+                             state_path=os.path.join(tmp, "ota_state.json"))
+        await asyncio.wait_for(updater.update(image), 30.0)
+    if client.acked != len(image):
+        raise AssertionError(f"cihaz {client.acked}/{len(image)} bayt onayladı")
+    return client.frames
+
+
+CHECKS = [("art arda bulk aktarım", check_back_to_back),
+          ("bağlı pencereyle bloklar", check_attached),
+          ("çok bloklu OTA", check_ota)]
+
+
+def main():
+    failed = False
+    for name, check in CHECKS:
+        try:
+            frames = asyncio.run(check())
+        except (TimeoutError, asyncio.TimeoutError, AssertionError) as e:
+            print(f"HATA: {name}: {e}")
+            failed = True
+        else:
+            print(f"{name:<26} tamam ({frames} çerçeve, pencere {WINDOW})")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# check_import_time.py
+# Qt'siz çekirdek modüllerin import süresini ölçer ve bütçeyi aşarsa hata verir.
+# Kullanım: python check_import_time.py [bütçe_ms]
+import json
+import re
+import subprocess
+import sys
+
+# Protokol ve taşıma katmanı; kayıt/analiz modülleri (ble_tsdb, ble_index ...) bütçeye dahil değil
+CORE_MODULES = ["ble_core", "wizepod", "ble_bulk", "ble_ota", "ble_scheduler",
+                "ble_battery"]
+IMPORT_BUDGET_MS = 15.0
+
+# Çekirdek import edildikten sonra yüklenmemiş olması gereken ağır paketler
+FORBIDDEN = ["PyQt6", "bleak", "qasync"]
+
+
+def measure(modules=CORE_MODULES, runs=5):
+    """
+    Temiz yorumlayıcılarda -X importtime ile ölçüm yapar; gürültüyü azaltmak için
+    her modülün `runs` ölçüm içindeki en küçük değeri alınır.
+    asyncio her async istemci için zaten gerekli olduğundan önceden yüklenir;
+    ölçülen süre çekirdeğin kendi maliyetidir.
+    Döner: (toplam_ms, {modül: kümülatif_ms}, yüklenen_yasaklı_paketler)
+    """
+    code = (
+        f"import asyncio, json, sys; import {', '.join(modules)}; "
+        f"print(json.dumps([m for m in {FORBIDDEN!r} if m in sys.modules]))"
+    )
+    per_module = {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, check=True,
+        )
+        for line in proc.stderr.splitlines():
+            m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+            if m and m.group(3) in modules and len(m.group(2)) == 1:
+                ms = int(m.group(1)) / 1000.0
+                per_module[m.group(3)] = min(ms, per_module.get(m.group(3), ms))
+        loaded = json.loads(proc.stdout)
+    return sum(per_module.values()), per_module, loaded
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET_MS
+    total, per_module, loaded = measure()
+    for name, ms in per_module.items():
+        print(f"{name:<12} {ms:7.2f} ms")
+    print(f"{'TOPLAM':<12} {total:7.2f} ms (bütçe {budget:.1f} ms)")
+    if loaded:
+        print("HATA: çekirdek şu paketleri yükledi:", ", ".join(loaded))
+        sys.exit(1)
+    if total > budget:
+        print("HATA: import süresi bütçeyi aşıyor.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,17 @@ import sys
 from qasync import QEventLoop
 from qasync import asyncSlot
 import asyncio
-import csv
-from ble_commands import *
-import os
+from ble_commands import call_core, read_versions_data, read_yazilim_version_notify
+from ble_daemon import SOCKET_PATH, DaemonClient, WizepodDaemon
+from ble_workers import Pipeline
+from ble_trace import LatencyTracer, now_ns
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QPushButton, QComboBox, QLineEdit, QLabel, QTextEdit, QGroupBox, QMessageBox
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from bleak import BleakScanner, BleakClient
+from PyQt6.QtCore import Qt, QThread, QEvent, pyqtSignal
 
 
-# CSV Dosya Adı
-CSV_FILE = "bluetooth_data.csv"
-
 # =======================
 # Bluetooth İş Parçacıkları
 # MAC : 48:23:35:F4:00:0B
@@ -26,12 +23,48 @@ class BluetoothScanner(QThread):
     devices_found = pyqtSignal(list)
 
     async def scan_devices(self):
+        from bleak import BleakScanner
         devices = await BleakScanner.discover()
         self.devices_found.emit([(d.name or "Bilinmeyen", d.address) for d in devices])
 
     def run(self):
         asyncio.run(self.scan_devices())
 
+class ServiceThread(QThread):
+    """
+    Uygulama açıkken ble_daemon servisini çalıştırır; cihaz bağlantısının tek sahibi odur.
+    OKU/YAZ komutları, sürekli okuma ve batarya aynı kalıcı bağlantıyı paylaşır;
+    test.py gibi betikler de aynı sokete bağlanır. Başka bir servis zaten
+    çalışıyorsa o kullanılır.
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        super().__init__()
+        self.path = path
+        self.running = True
+
+    async def serve(self):
+        daemon = WizepodDaemon(self.path)
+        try:
+            await daemon.start()
+        except RuntimeError as e:
+            print(e)
+            return
+        try:
+            while self.running:
+                await asyncio.sleep(0.2)
+        finally:
+            await daemon.stop()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except Exception as e:
+            print("Servis hatası:", e)
+
+    def stop(self):
+        self.running = False
+
 class BluetoothConnector(QThread):
     """Cihaza bağlanıp UUID’leri listeleyen iş parçacığı"""
     connected = pyqtSignal(list)
@@ -43,13 +76,12 @@ class BluetoothConnector(QThread):
 
     async def connect_device(self):
         try:
-            async with BleakClient(self.mac_address) as client:
-                if await client.is_connected():
-                    services = await client.get_services()
-                    uuid_list = [char.uuid for service in services for char in service.characteristics]
-                    self.connected.emit(uuid_list)
-                else:
-                    self.error.emit("Cihaza bağlanılamadı!")
+            # Bağlantıyı servis açar ve açık tutar; UUID'ler aynı bağlantıdan listelenir
+            async with DaemonClient() as service:
+                await service.connect_device(self.mac_address)
+                self.connected.emit(await service.services(self.mac_address))
+        except OSError:
+            self.error.emit("BLE servisine ulaşılamadı!")
         except Exception as e:
             self.error.emit(f"Bağlantı hatası: {e}")
 
@@ -57,42 +89,138 @@ class BluetoothConnector(QThread):
         asyncio.run(self.connect_device())
 
 class BluetoothReader(QThread):
-    """Seçilen UUID’den saniyelik veri çeken iş parçacığı"""
-    new_data = pyqtSignal(str)
-
-    def __init__(self, mac_address, char_uuid):
+    """
+    Seçilen UUID’den saniyelik veri okuma hattını (ble_workers.Pipeline) yönetir.
+    BLE okuma, kayıt ve analiz ayrı süreçlerde çalışır; bu iş parçacığı yalnızca
+    analiz sürecinin özetlerini UI'ya aktarır.
+
+    new_data(veri, iz): iz = (geliş, kuyruğa_konma, alınma, yayın) monoton
+    damgaları; hata mesajlarında None. Çizim aşaması UI tarafında eklenir.
+    alert(ble_alerts.Alert): alert_kind "glikoz" veya "sicaklik" ise cihazdaki
+    eşikler okunur ve başlayan/kalkan her alarm yayınlanır.
+    """
+    new_data = pyqtSignal(str, object)
+    alert = pyqtSignal(object)
+
+    def __init__(self, mac_address, char_uuid, period=1.0, heartbeat=60.0, deadband=0.0,
+                 alert_kind=None):
         super().__init__()
         self.mac_address = mac_address
         self.char_uuid = char_uuid
+        self.alert_kind = alert_kind
         self.running = True
-
-    async def read_sensor_data(self):
-        async with BleakClient(self.mac_address) as client:
-            if await client.is_connected():
-                while self.running:
-                    try:
-                        data = await client.read_gatt_char(self.char_uuid)
-                        decoded_data = data.decode(errors="ignore")
-                        self.new_data.emit(decoded_data)
-                        self.save_to_csv(decoded_data)
-                    except Exception as e:
-                        self.new_data.emit("Hata: " + str(e))
-                    await asyncio.sleep(1)
+        # Değişmeyen örnekler ne kayda ne de UI'ya gider (ble_ingest.ChangeDetector)
+        # BLE süreci cihazı servis üzerinden okur; komutlar okuma sürerken de çalışır
+        self.pipeline = Pipeline(mac_address, char_uuid, period=period,
+                                 heartbeat=heartbeat, deadband=deadband, socket_path=SOCKET_PATH)
+        self.tracer = LatencyTracer()
+
+    async def read_alert_rules(self):
+        """Cihazdaki eşiklerden ble_alerts kurallarını oluşturur."""
+        from ble_alerts import glucose_rules, temperature_rules
+        if self.alert_kind == "glikoz":
+            return glucose_rules(await call_core("read_glucose_thresholds", self.mac_address))
+        if self.alert_kind == "sicaklik":
+            return temperature_rules(await call_core("read_temperature_thresholds", self.mac_address))
+        return None
 
     def run(self):
-        asyncio.run(self.read_sensor_data())
+        if self.alert_kind:
+            # Eşikler okuma hattı başlamadan okunur; kurallar işçi süreçlerine bir kez verilir
+            try:
+                self.pipeline.alert_rules = asyncio.run(self.read_alert_rules())
+            except Exception as e:
+                self.new_data.emit("Hata: Alarm eşikleri okunamadı: " + str(e), None)
+        try:
+            self.pipeline.start()
+        except Exception as e:
+            self.new_data.emit("Hata: " + str(e), None)
+            return
+        try:
+            while self.running:
+                summaries = self.pipeline.poll()
+                if summaries:
+                    t_polled = now_ns()
+                    data = [s for s in summaries if "last" in s]
+                    for s in summaries:
+                        if "error" in s:
+                            self.new_data.emit(s["error"], None)
+                        for alert in s.get("alerts", ()):
+                            self.alert.emit(alert)
+                    if data:
+                        last = data[-1]
+                        trace = (last["t_ns"], last["t_queued"], t_polled, now_ns())
+                        self.new_data.emit(last["last"], trace)
+                self.msleep(100)
+        finally:
+            self.pipeline.stop()
 
     def stop(self):
         self.running = False
 
-    def save_to_csv(self, data):
-        file_exists = os.path.isfile(CSV_FILE)
-        with open(CSV_FILE, mode="a", newline="") as file:
-            writer = csv.writer(file)
-            if not file_exists:
-                writer.writerow(["Zaman", "Veri"])
-            writer.writerow([asyncio.get_event_loop().time(), data])
+    def record_paint(self, trace, t_slot, t_paint):
+        """Değerin ekrana çizildiği an; bildirimden çizime tüm aşamaları kaydeder."""
+        t_arrival, t_queued, t_polled, t_emit = trace
+        self.tracer.record(t_arrival, [("pipeline", t_queued), ("queue", t_polled),
+                                       ("emit", t_emit), ("signal", t_slot), ("paint", t_paint)])
+
+    def latency(self) -> dict:
+        """{"storage": {...}, "stats": {...}, "gui": {...}} aşama gecikmeleri."""
+        report = self.pipeline.latency()
+        report["gui"] = self.tracer.report()
+        return report
             
+class BatteryThread(QThread):
+    """
+    Batarya seviyesini servisin önbelleğinden okur; cihaza ayrı bağlantı açılmaz.
+    Seviyeyi servis kalıcı bağlantı üzerinden izler (notify veya komutların arkasında
+    uyarlanabilir sorgu). Bu iş parçacığı ayrıca GUI adına bağlantıyı tutar
+    (başka bir istemcinin disconnect'i bağlantıyı kapatmaz).
+    """
+    level_changed = pyqtSignal(int)
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, mac_address, interval=2.0):
+        super().__init__()
+        self.mac_address = mac_address
+        self.interval = interval
+        self.running = True
+
+    async def monitor(self):
+        level, connected = None, None
+        service = None
+        while self.running:
+            try:
+                if service is None or not service.connected:
+                    service = DaemonClient()
+                    await service.connect()
+                    await service.connect_device(self.mac_address)
+                state = await service.battery(self.mac_address)
+            except Exception as e:
+                print("Batarya izleme hatası:", e)
+                state = {"connected": False, "level": None}
+                if service is not None:
+                    await service.close()
+                service = None
+            if state["connected"] != connected:
+                connected = state["connected"]
+                self.connection_changed.emit(connected)
+            if state["level"] is not None and state["level"] != level:
+                level = state["level"]
+                self.level_changed.emit(level)
+            await asyncio.sleep(self.interval)
+        if service is not None:
+            await service.close()
+
+    def run(self):
+        try:
+            asyncio.run(self.monitor())
+        except Exception as e:
+            print("Batarya izleme hatası:", e)
+
+    def stop(self):
+        self.running = False
+
 class VersionReadThread(QThread):
     result = pyqtSignal(int, int)
     error  = pyqtSignal(str)
@@ -146,14 +274,26 @@ class BluetoothApp(QWidget):
         self.uuid_list = QComboBox()
         layout.addWidget(self.uuid_list)
 
+        self.alert_kind = QComboBox()
+        self.alert_kind.addItem("Alarm yok", None)
+        self.alert_kind.addItem("Glikoz eşikleri", "glikoz")
+        self.alert_kind.addItem("Sıcaklık eşikleri", "sicaklik")
+        layout.addWidget(self.alert_kind)
+
         self.start_button = QPushButton("Veri Okumaya Başla")
         self.start_button.clicked.connect(self.start_reading)
         layout.addWidget(self.start_button)
 
         self.data_field = QLineEdit("Veri burada görünecek...")
         self.data_field.setStyleSheet("background-color: #2b2b2b; color: #e0e0e0;")
+        self.data_field.installEventFilter(self)
+        self._paint_trace = None
         layout.addWidget(self.data_field)
 
+        self.alert_label = QLabel("Alarm yok")
+        layout.addWidget(self.alert_label)
+        self._active_alerts = {}
+
         self.setLayout(layout)
 
     def scan_devices(self):
@@ -199,13 +339,55 @@ class BluetoothApp(QWidget):
         if index == -1:
             return
         char_uuid = self.uuid_list.currentText()
-        self.reader_thread = BluetoothReader(self.selected_mac, char_uuid)
+        self.stop_reading()
+        self.reader_thread = BluetoothReader(self.selected_mac, char_uuid,
+                                             alert_kind=self.alert_kind.currentData())
         self.reader_thread.new_data.connect(self.update_data_field)
+        self.reader_thread.alert.connect(self.update_alerts)
+        self._active_alerts.clear()
+        self.update_alert_label()
         self.reader_thread.start()
 
-    def update_data_field(self, data):
+    def stop_reading(self, timeout_ms=10000):
+        reader = getattr(self, "reader_thread", None)
+        if reader is not None:
+            reader.stop()
+            reader.wait(timeout_ms)
+            self.reader_thread = None
+
+    def update_data_field(self, data, trace=None):
+        if trace is not None:
+            self._paint_trace = (trace, now_ns())
         self.data_field.setText(data)
 
+    def update_alerts(self, alert):
+        from ble_alerts import RAISE
+        if alert.kind == RAISE:
+            self._active_alerts[alert.rule] = alert.value
+            print(f"ALARM: {alert.rule} ({alert.value:g})")
+        else:
+            self._active_alerts.pop(alert.rule, None)
+            print(f"Alarm kalktı: {alert.rule} ({alert.value:g})")
+        self.update_alert_label()
+
+    def update_alert_label(self):
+        if self._active_alerts:
+            text = ", ".join(f"{rule} ({value:g})" for rule, value in self._active_alerts.items())
+            self.alert_label.setText("ALARM: " + text)
+            self.alert_label.setStyleSheet("color: #ff5555; font-weight: bold;")
+        else:
+            self.alert_label.setText("Alarm yok")
+            self.alert_label.setStyleSheet("")
+
+    def eventFilter(self, obj, event):
+        # Yeni değerin ilk çizimi uçtan uca gecikmenin son aşamasıdır
+        if obj is self.data_field and event.type() == QEvent.Type.Paint and self._paint_trace:
+            trace, t_slot = self._paint_trace
+            self._paint_trace = None
+            if self.reader_thread is not None:
+                self.reader_thread.record_paint(trace, t_slot, now_ns())
+        return super().eventFilter(obj, event)
+
 # =======================
 # WIZEPOD Ana Pencere
 # =======================
@@ -230,6 +412,32 @@ class WIZEPODMainWindow(QMainWindow):
         self.selected_mac = mac
         self.connected = True
         print(f"[WIZEPOD] Bağlı cihaz: {mac}")
+        if getattr(self, "battery_thread", None):
+            # Çalışan QThread referansı bırakılmadan önce bitmesi beklenir
+            self.battery_thread.stop()
+            self.battery_thread.wait(3000)
+        self.battery_thread = BatteryThread(mac)
+        self.battery_thread.level_changed.connect(self.update_battery_label)
+        self.battery_thread.connection_changed.connect(self.update_battery_connection)
+        self.battery_thread.start()
+
+    def update_battery_label(self, level):
+        self.battery_label.setText(f"Batarya: %{level}")
+
+    def update_battery_connection(self, connected):
+        if not connected:
+            self.battery_label.setText("Batarya: bağlantı yok")
+
+    def closeEvent(self, event):
+        if getattr(self, "battery_thread", None):
+            self.battery_thread.stop()
+            self.battery_thread.wait(3000)
+        # Okuma hattı düzgün durdurulur; kayıt süreci açık chunk'ı ve CSV indeksini kapatır
+        self.left_panel.stop_reading()
+        # Servis en son durur; bağlantıyı kapatır ve soketi siler
+        self.service_thread.stop()
+        self.service_thread.wait(5000)
+        super().closeEvent(event)
 
 
 
@@ -240,6 +448,9 @@ class WIZEPODMainWindow(QMainWindow):
         self.setWindowTitle("WIZEPOD")
         self.setMinimumSize(1200, 800)
 
+        self.service_thread = ServiceThread()
+        self.service_thread.start()
+
         main_widget = QWidget()
         main_layout = QHBoxLayout(main_widget)
 
@@ -427,7 +638,7 @@ class WIZEPODMainWindow(QMainWindow):
         charts_layout.addWidget(self.temperature_chart)
         layout.addLayout(charts_layout)
 
-        self.battery_label = QLabel("Batarya: %61")
+        self.battery_label = QLabel("Batarya: --")
         layout.addWidget(self.battery_label)
 
         buttons_layout = QHBoxLayout()
@@ -485,6 +696,10 @@ class WIZEPODMainWindow(QMainWindow):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # OKU/YAZ butonları asyncio görevleri başlatır; Qt döngüsü asyncio döngüsü olarak çalışır
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
     window = WIZEPODMainWindow()
     window.show()
-    sys.exit(app.exec())
+    with loop:
+        loop.run_forever()
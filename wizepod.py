@@ -0,0 +1,212 @@
+# wizepod.py
+# WIZEPOD BLE oturumu: tek bağlantı üzerinden komut gönderme,
+# indicate cevaplarını toplama ve toplu (bulk) veri aktarımı.
+import asyncio
+
+from ble_bulk import (
+    ATT_DEFAULT_MTU, BULK_CREDIT, BULK_REPLY, BulkTransfer, Reassembler,
+)
+from ble_ring import FrameRing, ring_size
+from ble_trace import now_ns
+
+# WRITE ve INDICATE UUID’leri
+WRITE_UUID    = "5a87b4ef-3bfa-76a8-e642-92933c31434f"  # Write Without Response
+INDICATE_UUID = "9e1547ba-c365-57b5-2947-c5e1c1e1d528"  # Indicate
+
+# Bildirim halkası: her indicate bir kez önceden ayrılmış slota kopyalanır
+RX_SLOTS     = 64
+RX_SLOT_SIZE = 512   # ATT öznitelik değeri en fazla 512 bayt
+
+
+def to_hex(data: bytes) -> str:
+    """0xAA 0xBB 0xCC formatında hex string döner."""
+    return ' '.join(f'0x{b:02X}' for b in data)
+
+
+class Wizepod:
+    def __init__(self, addr, client=None):
+        self.addr     = addr
+        self.client   = client or self._make_client(addr)
+        self.mtu      = ATT_DEFAULT_MTU
+        self._evt     = asyncio.Event()
+        self.rx       = FrameRing(bytearray(ring_size(RX_SLOTS, RX_SLOT_SIZE)), RX_SLOTS, RX_SLOT_SIZE)
+        self._waiting = False
+        self._reply_seq  = None
+        self._bulk_reply = None
+        self._bulk_rx = Reassembler()
+        self._credits = None
+        self._listeners = {}
+        self.capture  = None
+
+    @staticmethod
+    def _make_client(addr):
+        # bleak geç yüklenir; oturum nesnesini import etmek BLE yığınını açmaz
+        from bleak import BleakClient
+        return BleakClient(addr)
+
+    async def connect(self):
+        await self.client.connect()
+        if not self.client.is_connected:
+            from bleak import BleakError
+            raise BleakError("BLE bağlantısı kurulamadı")
+        self.mtu = await self.query_mtu()
+        # Indicate callback’i kaydet
+        await self.client.start_notify(INDICATE_UUID, self._on_indicate)
+
+    async def disconnect(self):
+        self.stop_capture()
+        try:
+            await self.client.stop_notify(INDICATE_UUID)
+        except Exception:
+            pass
+        await self.client.disconnect()
+
+    async def query_mtu(self) -> int:
+        """
+        Bağlantıda anlaşılan ATT MTU değerini döner.
+        BlueZ MTU'yu ilk yazmaya kadar bildirmediği için önce talep edilir.
+        """
+        backend = getattr(self.client, "_backend", None)
+        if hasattr(backend, "_acquire_mtu"):
+            try:
+                await backend._acquire_mtu()
+            except Exception:
+                pass
+        return getattr(self.client, "mtu_size", None) or ATT_DEFAULT_MTU
+
+    def attach_credits(self, window):
+        """Bulk aktarım sırasında 0x71 kredi çerçevelerinin iletileceği pencere."""
+        self._credits = window
+
+    def add_listener(self, opcode: int, callback):
+        """
+        Belirli bir opcode ile başlayan indicate çerçevelerini callback'e yönlendirir.
+        Bu çerçeveler send() cevabı olarak sayılmaz.
+        """
+        self._listeners[opcode] = callback
+
+    def remove_listener(self, opcode: int):
+        self._listeners.pop(opcode, None)
+
+    def start_capture(self, path):
+        """Tüm TX/RX çerçevelerini zaman damgalarıyla `path` dosyasına kaydeder (bkz. ble_capture)."""
+        from ble_capture import CaptureWriter
+        self.stop_capture()
+        self.capture = CaptureWriter(path)
+
+    def stop_capture(self):
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+
+    def _on_indicate(self, sender, data: bytearray):
+        t_arrival = now_ns()
+        if self.capture is not None:
+            self.capture.rx(data, t_arrival)
+        # Boş ve ilk 0x00 bildirimlerini atla
+        if not data or data == b'\x00':
+            return
+        listener = self._listeners.get(data[0])
+        if listener is not None:
+            listener(bytes(data))
+            return
+        if data[0] == BULK_CREDIT:
+            if self._credits is not None and len(data) > 1:
+                self._credits.grant(data[1])
+            return
+        if data[0] == BULK_REPLY:
+            # Çok paketli cevap: son paket gelene kadar bekleyeni uyandırma
+            try:
+                full = self._bulk_rx.feed(data)
+            except ValueError as e:
+                print("Bulk cevap hatası:", e)
+                return
+            if full is None:
+                return
+            self._bulk_reply = full
+            self._evt.set()
+            return
+        seq = self.rx.push(data, t_arrival)
+        if seq is None:
+            # Okunmamış cevap korunuyor, bu çerçeve düşürüldü (rx.overruns)
+            return
+        if self._waiting and self._reply_seq is None:
+            # Komuttan sonraki ilk çerçeve cevaptır; okunana kadar ezilmesin
+            self._reply_seq = seq
+            self.rx.pinned = seq
+            self._evt.set()
+
+    def frames(self, from_start=False):
+        """Bildirim akışı için okuyucu (read_views() ile kopyasız erişim)."""
+        return self.rx.reader(from_start)
+
+    def release(self):
+        """send_view() ile alınan cevabın korumasını kaldırır."""
+        self.rx.pinned = None
+
+    async def write(self, frame: bytes):
+        """Tek çerçeveyi Write Without Response ile yazar (cevap beklemez)."""
+        if self.capture is not None:
+            self.capture.tx(frame)
+        await self.client.write_gatt_char(WRITE_UUID, frame, response=False)
+
+    async def send_view(self, cmd_bytes: list[int], timeout: float = 5.0):
+        """
+        Komutu gönderir ve cevabı kopyalamadan döner: (sıra, memoryview).
+        Cevap slotu release() çağrılana (veya sonraki komuta) kadar korunur.
+        Çok paketli cevaplarda sıra -1 ve view birleştirilmiş veri üzerindedir.
+        """
+        cmd = bytearray(cmd_bytes)
+        print(f"Gönderilen komut: {to_hex(cmd)}")
+
+        # Event’i sıfırla
+        self._evt.clear()
+        self.rx.pinned = None
+        self._reply_seq = None
+        self._bulk_reply = None
+        self._bulk_rx.reset()
+        self._waiting = True
+
+        try:
+            # Yaz (Write Without Response)
+            await self.write(cmd)
+
+            # Indicate’dan cevabı bekle
+            try:
+                await asyncio.wait_for(self._evt.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError("Cihazdan yanıt gelmedi (indicate).")
+        finally:
+            self._waiting = False
+
+        if self._bulk_reply is not None:
+            return -1, memoryview(self._bulk_reply)
+        return self._reply_seq, self.rx.view(self._reply_seq)
+
+    async def send(self, cmd_bytes: list[int], timeout: float = 5.0) -> bytes:
+        """
+        cmd_bytes: [0x51, 0x02, 0x10] gibi doğrudan hex byte’lar
+        Döner: gelen raw bayt dizisi (çok paketli cevaplar birleştirilmiş olarak)
+        """
+        seq, view = await self.send_view(cmd_bytes, timeout)
+        raw = bytes(view)
+        view.release()
+        self.release()
+        print(f"Gelen raw: {to_hex(raw)}")
+        return raw
+
+    async def send_bulk(self, data: bytes, window: int = 8, device_credits: bool = True) -> int:
+        """
+        Büyük veriyi MTU boyutunda parçalayıp kredi penceresiyle gönderir.
+        Döner: gönderilen çerçeve sayısı
+        """
+        transfer = BulkTransfer(self, window=window, device_credits=device_credits)
+        return await transfer.send(data)
+
+    @staticmethod
+    def parse(raw: bytes) -> list[int]:
+        """Her 2 baytı little‑endian 16‑bit tamsayıya çevir."""
+        return [
+            int.from_bytes(raw[i : i + 2], byteorder="little", signed=False)
+            for i in range(0, len(raw), 2)
+        ]